@@ -6,24 +6,23 @@ with OpenAI API integration, user authentication, custom bot creation, and moder
 """
 
 import streamlit as st
-from openai import OpenAI
-import tiktoken
-from datetime import datetime, timedelta
+import streamlit.components.v1 as components
+from datetime import datetime
 import json
 import time
-from typing import Dict, List, Tuple, Optional
-import logging
 import hashlib
+from typing import Dict, List, Tuple, Optional, Mapping, Iterator, TYPE_CHECKING
+import logging
+import asyncio
 import os
-import pandas as pd
-import io
-import base64
-import requests
-from PIL import Image
-import plotly.express as px
-import plotly.graph_objects as go
-from plotly.subplots import make_subplots
-import uuid
+import sqlite3
+import threading
+import functools
+from collections import ChainMap, Counter, defaultdict, deque
+from dataclasses import dataclass
+
+if TYPE_CHECKING:
+    from openai import OpenAI
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -125,22 +124,8 @@ button[data-testid="collapsedControl"] {
     margin: 0 auto;
 }
 
-.user-message {
-    background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-    color: white;
-    padding: 15px 20px;
-    border-radius: 20px 20px 5px 20px;
-    margin: 10px 0 10px 50px;
-    box-shadow: 0 2px 10px rgba(102, 126, 234, 0.3);
-}
-
-.assistant-message {
-    background: #f8f9fa;
-    color: #333;
-    padding: 15px 20px;
-    border-radius: 20px 20px 20px 5px;
-    margin: 10px 50px 10px 0;
-    border-left: 4px solid #667eea;
+[data-testid="stChatMessage"] {
+    border-radius: 15px;
     box-shadow: 0 2px 10px rgba(0,0,0,0.1);
 }
 
@@ -235,11 +220,6 @@ button[data-testid="collapsedControl"] {
 
 /* Responsive design */
 @media (max-width: 768px) {
-    .user-message, .assistant-message {
-        margin-left: 10px;
-        margin-right: 10px;
-    }
-    
     .main-header {
         padding: 15px;
     }
@@ -258,67 +238,121 @@ button[data-testid="collapsedControl"] {
 </style>
 """
 
-st.markdown(hide_streamlit_style, unsafe_allow_html=True)
-
-# Force sidebar to stay open with JavaScript
-sidebar_js = """
+# Keeps the sidebar expanded after login. Runs in a components.html iframe (st.markdown drops
+# <script> tags), watches only the sidebar's own style/class changes and debounces the fix-up
+SIDEBAR_MONITOR_JS = """
 <script>
-// Force sidebar to stay expanded
-document.addEventListener('DOMContentLoaded', function() {
-    const sidebar = document.querySelector('section[data-testid="stSidebar"]');
+const doc = window.parent.document;
+
+function maintainSidebar() {
+    const sidebar = doc.querySelector('section[data-testid="stSidebar"]');
     if (sidebar) {
+        // Force sidebar to be visible and expanded
+        sidebar.style.width = '300px';
+        sidebar.style.minWidth = '300px';
+        sidebar.style.maxWidth = '300px';
         sidebar.style.display = 'block';
         sidebar.style.visibility = 'visible';
         sidebar.style.opacity = '1';
-    }
-    
-    // Remove any collapse functionality
-    const collapseBtn = document.querySelector('button[data-testid="collapsedControl"]');
-    if (collapseBtn) {
-        collapseBtn.style.display = 'none';
-    }
-});
-
-// Continuous check to ensure sidebar stays visible
-setInterval(function() {
-    const sidebar = document.querySelector('section[data-testid="stSidebar"]');
-    if (sidebar) {
-        if (sidebar.style.width === '0px' || sidebar.style.display === 'none') {
-            sidebar.style.width = '300px';
-            sidebar.style.display = 'block';
-            sidebar.style.visibility = 'visible';
-            sidebar.style.opacity = '1';
+        
+        // Hide the collapse button to prevent accidental hiding
+        const collapseBtn = doc.querySelector('button[data-testid="collapsedControl"]');
+        if (collapseBtn) {
+            collapseBtn.style.display = 'none';
         }
     }
-}, 500);
+}
+
+function debounce(fn, wait) {
+    let timer;
+    return () => {
+        clearTimeout(timer);
+        timer = setTimeout(fn, wait);
+    };
+}
+
+maintainSidebar();
+const sidebar = doc.querySelector('section[data-testid="stSidebar"]');
+if (sidebar) {
+    new MutationObserver(debounce(maintainSidebar, 250)).observe(sidebar, {
+        attributes: true,
+        attributeFilter: ['style', 'class']
+    });
+}
 </script>
 """
 
-st.markdown(sidebar_js, unsafe_allow_html=True)
+# Served by Streamlit's static file server (see .streamlit/config.toml) so the browser caches it
+STATIC_CSS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "static", "enhanced.css")
+
+@st.cache_resource
+def _stylesheet_markup() -> str:
+    """Write the stylesheet to the static folder once and return the tag that loads it"""
+    if not st.get_option("server.enableStaticServing"):
+        return hide_streamlit_style
+    
+    stylesheet = hide_streamlit_style.strip().removeprefix("<style>").removesuffix("</style>")
+    try:
+        os.makedirs(os.path.dirname(STATIC_CSS_PATH), exist_ok=True)
+        with open(STATIC_CSS_PATH, "w") as f:
+            f.write(stylesheet)
+    except OSError as e:
+        logger.error(f"Error writing static stylesheet: {str(e)}")
+        return hide_streamlit_style
+    
+    # Versioned URL so a changed stylesheet isn't served from the browser cache
+    version = hashlib.sha256(stylesheet.encode()).hexdigest()[:16]
+    return f'<link rel="stylesheet" href="app/static/enhanced.css?v={version}">'
+
+st.markdown(_stylesheet_markup(), unsafe_allow_html=True)
 
 # ======================================================
 # 🔑 API CONFIGURATION
 # ======================================================
 
-def initialize_openai():
-    """Initialize OpenAI client with API key from secrets or environment"""
+def _resolve_api_key() -> Optional[str]:
+    """Read the OpenAI API key from secrets or environment"""
     try:
         # Try Streamlit secrets first
         if hasattr(st, 'secrets') and 'OPENAI_API_KEY' in st.secrets:
-            api_key = st.secrets['OPENAI_API_KEY']
-            return OpenAI(api_key=api_key), api_key
+            return st.secrets['OPENAI_API_KEY']
         
         # Fallback to environment variable
         elif 'OPENAI_API_KEY' in os.environ:
-            api_key = os.environ['OPENAI_API_KEY']
-            return OpenAI(api_key=api_key), api_key
+            return os.environ['OPENAI_API_KEY']
         
         # No API key found
-        return None, None
+        return None
         
     except Exception as e:
         logger.error(f"Failed to initialize OpenAI: {str(e)}")
+        return None
+
+# Model for agents that don't name one; the sidebar can override it per conversation
+DEFAULT_MODEL = "gpt-4o-mini"
+MODEL_OVERRIDE_OPTIONS = ["Agent default", "gpt-4o-mini", "gpt-4o"]
+
+# Connection pool for the shared OpenAI client
+OPENAI_MAX_CONNECTIONS = 100
+OPENAI_KEEPALIVE_CONNECTIONS = 10
+
+@st.cache_resource
+def get_openai_client(api_key: str) -> "OpenAI":
+    """One OpenAI client (and connection pool) per API key, shared across reruns"""
+    # Imported here so pages that never chat don't pay for loading the SDK
+    import httpx
+    from openai import OpenAI
+    
+    # Shared by every session, so keep enough idle connections warm for concurrent chats
+    http_client = httpx.Client(limits=httpx.Limits(max_connections=OPENAI_MAX_CONNECTIONS, max_keepalive_connections=OPENAI_KEEPALIVE_CONNECTIONS))
+    return OpenAI(api_key=api_key, http_client=http_client)
+
+def initialize_openai():
+    """Initialize OpenAI client with API key from secrets or environment"""
+    api_key = _resolve_api_key()
+    if not api_key:
         return None, None
+    return get_openai_client(api_key), api_key
 
 # ======================================================
 # 🤖 AI AGENT PERSONALITIES (PREDEFINED)
@@ -331,6 +365,7 @@ BOT_PERSONALITIES = {
         "emoji": "🚀",
         "category": "Entrepreneurship & Startups",
         "temperature": 0.7,
+        "model": "gpt-4o-mini",
         "specialties": ["Business Planning", "MVP Development", "Product-Market Fit", "Growth Hacking"],
         "quick_actions": ["Create Business Plan", "Validate Idea", "Find Co-founder", "Pitch Deck Help"],
         "is_custom": False
@@ -340,6 +375,7 @@ BOT_PERSONALITIES = {
         "emoji": "📝",
         "category": "Entrepreneurship & Startups",
         "temperature": 0.6,
+        "model": "gpt-4o-mini",
         "specialties": ["Business Plans", "Market Analysis", "Financial Projections", "Investor Presentations"],
         "quick_actions": ["Write Executive Summary", "Market Research", "Financial Model", "Competitive Analysis"],
         "is_custom": False
@@ -349,6 +385,7 @@ BOT_PERSONALITIES = {
         "emoji": "💼",
         "category": "Entrepreneurship & Startups",
         "temperature": 0.6,
+        "model": "gpt-4o-mini",
         "specialties": ["Fundraising", "Pitch Decks", "Investor Relations", "Valuation"],
         "quick_actions": ["Create Pitch Deck", "Find Investors", "Prepare Due Diligence", "Valuation Help"],
         "is_custom": False
@@ -360,6 +397,7 @@ BOT_PERSONALITIES = {
         "emoji": "📈",
         "category": "Sales & Marketing",
         "temperature": 0.8,
+        "model": "gpt-4o-mini",
         "specialties": ["Sales Funnels", "Conversion Optimization", "Objection Handling", "Closing Techniques"],
         "quick_actions": ["Sales Script", "Objection Handling", "Pipeline Review", "Closing Tips"],
         "is_custom": False
@@ -369,6 +407,7 @@ BOT_PERSONALITIES = {
         "emoji": "📱",
         "category": "Sales & Marketing",
         "temperature": 0.8,
+        "model": "gpt-4o-mini",
         "specialties": ["Digital Marketing", "Brand Positioning", "Customer Acquisition", "Campaign Strategy"],
         "quick_actions": ["Marketing Plan", "Brand Strategy", "Campaign Ideas", "Target Audience"],
         "is_custom": False
@@ -378,6 +417,7 @@ BOT_PERSONALITIES = {
         "emoji": "✍️",
         "category": "Sales & Marketing",
         "temperature": 0.8,
+        "model": "gpt-4o-mini",
         "specialties": ["Content Strategy", "Editorial Calendars", "Storytelling", "Brand Authority"],
         "quick_actions": ["Content Calendar", "Blog Ideas", "Social Posts", "Video Scripts"],
         "is_custom": False
@@ -389,6 +429,7 @@ BOT_PERSONALITIES = {
         "emoji": "💰",
         "category": "Finance & Accounting",
         "temperature": 0.5,
+        "model": "gpt-4o",
         "specialties": ["Financial Planning", "Budget Management", "Cash Flow", "Cost Control"],
         "quick_actions": ["Budget Planning", "Cash Flow Analysis", "Cost Reduction", "Financial Reports"],
         "is_custom": False
@@ -398,6 +439,7 @@ BOT_PERSONALITIES = {
         "emoji": "🏦",
         "category": "Finance & Accounting",
         "temperature": 0.5,
+        "model": "gpt-4o",
         "specialties": ["Corporate Finance", "M&A", "Capital Raising", "Valuations"],
         "quick_actions": ["Deal Analysis", "Valuation Model", "M&A Strategy", "Capital Structure"],
         "is_custom": False
@@ -409,6 +451,7 @@ BOT_PERSONALITIES = {
         "emoji": "🔄",
         "category": "Technology & Innovation",
         "temperature": 0.7,
+        "model": "gpt-4o-mini",
         "specialties": ["Digital Strategy", "Technology Adoption", "Change Management", "Innovation"],
         "quick_actions": ["Digital Roadmap", "Tech Assessment", "Change Plan", "Innovation Strategy"],
         "is_custom": False
@@ -418,6 +461,7 @@ BOT_PERSONALITIES = {
         "emoji": "🤖",
         "category": "Technology & Innovation",
         "temperature": 0.7,
+        "model": "gpt-4o-mini",
         "specialties": ["AI Implementation", "Machine Learning", "Automation", "AI Strategy"],
         "quick_actions": ["AI Roadmap", "Use Case Analysis", "Automation Plan", "ML Strategy"],
         "is_custom": False
@@ -429,6 +473,7 @@ BOT_PERSONALITIES = {
         "emoji": "⚙️",
         "category": "Operations & Management",
         "temperature": 0.6,
+        "model": "gpt-4o-mini",
         "specialties": ["Process Improvement", "Supply Chain", "Lean Methodologies", "Efficiency"],
         "quick_actions": ["Process Map", "Efficiency Audit", "Workflow Design", "Cost Optimization"],
         "is_custom": False
@@ -438,6 +483,7 @@ BOT_PERSONALITIES = {
         "emoji": "📋",
         "category": "Operations & Management",
         "temperature": 0.6,
+        "model": "gpt-4o-mini",
         "specialties": ["Project Planning", "Resource Management", "Risk Management", "Stakeholder Communication"],
         "quick_actions": ["Project Plan", "Risk Assessment", "Team Structure", "Timeline Creation"],
         "is_custom": False
@@ -449,6 +495,7 @@ BOT_PERSONALITIES = {
         "emoji": "👥",
         "category": "Human Resources",
         "temperature": 0.7,
+        "model": "gpt-4o-mini",
         "specialties": ["Talent Management", "Culture Building", "Performance Management", "Employee Engagement"],
         "quick_actions": ["Hiring Strategy", "Performance Review", "Culture Assessment", "Team Building"],
         "is_custom": False
@@ -458,38 +505,77 @@ BOT_PERSONALITIES = {
         "emoji": "🎯",
         "category": "Human Resources",
         "temperature": 0.7,
+        "model": "gpt-4o-mini",
         "specialties": ["Recruitment Strategy", "Candidate Assessment", "Employer Branding", "Interview Process"],
         "quick_actions": ["Job Description", "Interview Questions", "Candidate Screening", "Offer Strategy"],
         "is_custom": False
     }
 }
 
+def _with_card_fields(bot: Dict) -> Dict:
+    """Precompute the display strings the agent card needs so renders don't rebuild them"""
+    bot['_specialties_str'] = ', '.join(bot.get('specialties', [])[:2])
+    return bot
+
+for _bot in BOT_PERSONALITIES.values():
+    _with_card_fields(_bot)
+
 # ======================================================
 # 🗄️ CUSTOM BOT DATA MANAGEMENT
 # ======================================================
 
+# Custom bots live in one SQLite database shared by every session. WAL mode lets readers
+# proceed while a write commits, and synchronous=NORMAL skips the per-commit fsync WAL doesn't need
+CUSTOM_BOTS_DB_PATH = os.path.join(os.path.expanduser("~"), ".aibot", "custom_bots.db")
+
+@st.cache_resource
+def _bot_store() -> Tuple[sqlite3.Connection, threading.Lock]:
+    """Open the custom bot store once per process; the lock serialises writes on the shared connection"""
+    os.makedirs(os.path.dirname(CUSTOM_BOTS_DB_PATH), exist_ok=True)
+    conn = sqlite3.connect(CUSTOM_BOTS_DB_PATH, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS custom_bots (user_id TEXT, name TEXT, json TEXT, PRIMARY KEY (user_id, name))"
+    )
+    conn.commit()
+    return conn, threading.Lock()
+
+def _write_custom_bots(sql: str, params: Tuple):
+    """Run one write against the bot store and invalidate everything derived from it"""
+    conn, lock = _bot_store()
+    with lock, conn:
+        conn.execute(sql, params)
+    load_custom_bots.clear()
+    st.session_state.bots_version += 1
+    st.session_state.stats['custom_bots'] = None
+
+# Short ttl picks up writes from other processes; writes in this one clear it immediately
+@st.cache_data(ttl=60, show_spinner=False)
 def load_custom_bots(user_id: str) -> Dict[str, Dict]:
     """Load custom bots for a specific user"""
-    if 'custom_bots' not in st.session_state:
-        st.session_state.custom_bots = {}
-    
-    return st.session_state.custom_bots.get(user_id, {})
+    try:
+        conn, _ = _bot_store()
+        rows = conn.execute("SELECT name, json FROM custom_bots WHERE user_id = ?", (user_id,)).fetchall()
+        return {name: _with_card_fields(json.loads(data)) for name, data in rows}
+    except Exception as e:
+        logger.error(f"Error loading custom bots: {str(e)}")
+        return {}
 
 def save_custom_bot(user_id: str, bot_name: str, bot_data: Dict) -> bool:
     """Save a custom bot for a specific user"""
     try:
-        if 'custom_bots' not in st.session_state:
-            st.session_state.custom_bots = {}
-        
-        if user_id not in st.session_state.custom_bots:
-            st.session_state.custom_bots[user_id] = {}
-        
         # Add metadata
         bot_data['is_custom'] = True
         bot_data['created_at'] = datetime.now().isoformat()
         bot_data['updated_at'] = datetime.now().isoformat()
         
-        st.session_state.custom_bots[user_id][bot_name] = bot_data
+        # Underscore fields are derived on load and never written back
+        stored = {k: v for k, v in bot_data.items() if not k.startswith('_')}
+        _write_custom_bots(
+            "INSERT OR REPLACE INTO custom_bots (user_id, name, json) VALUES (?, ?, ?)",
+            (user_id, bot_name, json.dumps(stored))
+        )
         return True
     except Exception as e:
         logger.error(f"Error saving custom bot: {str(e)}")
@@ -498,22 +584,38 @@ def save_custom_bot(user_id: str, bot_name: str, bot_data: Dict) -> bool:
 def delete_custom_bot(user_id: str, bot_name: str) -> bool:
     """Delete a custom bot for a specific user"""
     try:
-        if ('custom_bots' in st.session_state and 
-            user_id in st.session_state.custom_bots and 
-            bot_name in st.session_state.custom_bots[user_id]):
-            del st.session_state.custom_bots[user_id][bot_name]
+        if bot_name in load_custom_bots(user_id):
+            _write_custom_bots("DELETE FROM custom_bots WHERE user_id = ? AND name = ?", (user_id, bot_name))
             return True
         return False
     except Exception as e:
         logger.error(f"Error deleting custom bot: {str(e)}")
         return False
 
-def get_all_bots(user_id: str) -> Dict[str, Dict]:
-    """Get all bots (predefined + custom) for a user"""
-    all_bots = BOT_PERSONALITIES.copy()
-    custom_bots = load_custom_bots(user_id)
-    all_bots.update(custom_bots)
-    return all_bots
+def delete_all_custom_bots(user_id: str) -> bool:
+    """Delete every custom bot a user has"""
+    try:
+        _write_custom_bots("DELETE FROM custom_bots WHERE user_id = ?", (user_id,))
+        return True
+    except Exception as e:
+        logger.error(f"Error deleting custom bots: {str(e)}")
+        return False
+
+def custom_bot_count(user_id: str) -> int:
+    """Number of custom bots the user has, counted on first read and again after each write"""
+    stats = st.session_state.stats
+    if stats['custom_bots'] is None:
+        stats['custom_bots'] = len(load_custom_bots(user_id))
+    return stats['custom_bots']
+
+def get_all_bots(user_id: str) -> Mapping[str, Dict]:
+    """Get a read-only view of all bots (custom bots shadow predefined ones) for a user"""
+    # Memoised per session on (user_id, bots_version); _write_custom_bots bumps the version
+    key = (user_id, st.session_state.bots_version)
+    cached = st.session_state.get('all_bots_cache')
+    if cached is None or cached[0] != key:
+        cached = st.session_state.all_bots_cache = (key, ChainMap(load_custom_bots(user_id), BOT_PERSONALITIES))
+    return cached[1]
 
 # ======================================================
 # 🧠 AGENT PROMPT GENERATION
@@ -522,8 +624,10 @@ def get_all_bots(user_id: str) -> Dict[str, Dict]:
 def get_agent_prompt(agent_name: str, user_id: str = None) -> str:
     """Generate system prompt for an agent (predefined or custom)"""
     all_bots = get_all_bots(user_id) if user_id else BOT_PERSONALITIES
-    agent = all_bots.get(agent_name)
-    
+    return agent_system_prompt(agent_name, all_bots.get(agent_name))
+
+def agent_system_prompt(agent_name: str, agent: Optional[Dict]) -> str:
+    """System prompt for an already-resolved agent"""
     if not agent:
         return "You are a helpful AI assistant."
     
@@ -532,66 +636,172 @@ def get_agent_prompt(agent_name: str, user_id: str = None) -> str:
         return agent['system_prompt']
     
     # For predefined bots, generate prompt from description and specialties
-    prompt = f"""You are {agent_name}, {agent['description']}
+    return _persona_prompt(agent_name, agent['description'], tuple(agent.get('specialties', [])))
+
+@st.cache_data(max_entries=128, show_spinner=False)
+def _persona_prompt(agent_name: str, description: str, specialties: Tuple[str, ...]) -> str:
+    """Build the system prompt for a persona; identical inputs give byte-identical output"""
+    return f"""You are {agent_name}, {description}
 
-Your specialties include: {', '.join(agent.get('specialties', []))}
+Your specialties include: {', '.join(specialties)}
 
 You should respond in a professional, helpful manner while staying true to your role and expertise. 
 Provide actionable advice and insights based on your specialization.
 Be specific, practical, and focus on delivering value to business users.
 """
-    return prompt
 
 # ======================================================
 # 💬 CHAT FUNCTIONALITY
 # ======================================================
 
-def chat_with_agent(user_message: str, agent_name: str, user_id: str = None) -> str:
-    """Chat with an AI agent using OpenAI API"""
+def _prompt_cache_body(system_prompt: str) -> Dict:
+    """Request body extras that route calls sharing a system prompt to the same OpenAI prompt cache"""
+    # Sent via extra_body so older SDKs that lack the prompt_cache_key argument still pass it through
+    return {'prompt_cache_key': hashlib.blake2b(system_prompt.encode(), digest_size=16).hexdigest()}
+
+def resolve_model(agent: Dict) -> str:
+    """Model for a turn: the conversation's override if one is chosen, else the agent's own"""
+    model_choice = st.session_state.get('model_choice', "Agent default")
+    return agent.get('model', DEFAULT_MODEL) if model_choice == "Agent default" else model_choice
+
+def _store_model_choice():
+    """Copy the model widget into a plain key; Streamlit drops widget keys on pages that don't draw them"""
+    st.session_state.model_choice = st.session_state.model_override_widget
+
+def build_chat_request(user_message: str, agent_name: str, agent: Optional[Dict]) -> Dict:
+    """Model, messages and sampling settings for one turn with an agent"""
+    # The system prompt is a stable prefix so OpenAI's prompt cache can reuse it across turns
+    system_prompt = agent_system_prompt(agent_name, agent)
+    messages = [
+        {"role": "system", "content": system_prompt},
+    ]
+    agent = agent or {}
+    
+    # Add this agent's recent turns for context, however long ago they happened
+    for message, response, _ in st.session_state.per_agent_history.get(agent_name, ()):
+        messages.append({"role": "user", "content": message})
+        messages.append({"role": "assistant", "content": response})
+    
+    # Add current message
+    messages.append({"role": "user", "content": user_message})
+    
+    return {
+        'model': resolve_model(agent),
+        'messages': messages,
+        'temperature': agent.get('temperature', 0.7),
+        'max_tokens': 1500,
+        'extra_body': _prompt_cache_body(system_prompt)
+    }
+
+def chat_with_agent(user_message: str, agent_name: str, agent: Optional[Dict]) -> Iterator[str]:
+    """Chat with an already-resolved AI agent using OpenAI API, yielding the reply as it streams in"""
     client, api_key = initialize_openai()
     
     if not client:
-        return "⚠️ OpenAI API key not configured. Please add your API key to Streamlit secrets or environment variables to continue."
+        yield "⚠️ OpenAI API key not configured. Please add your API key to Streamlit secrets or environment variables to continue."
+        return
     
     try:
-        all_bots = get_all_bots(user_id) if user_id else BOT_PERSONALITIES
-        agent = all_bots.get(agent_name, all_bots.get("Startup Strategist"))
-        
-        messages = [
-            {"role": "system", "content": get_agent_prompt(agent_name, user_id)},
-        ]
+        stream = client.chat.completions.create(
+            **build_chat_request(user_message, agent_name, agent),
+            stream=True
+        )
         
-        # Add recent chat history for context (only for same agent)
-        if st.session_state.chat_history:
-            recent_history = [msg for msg in st.session_state.chat_history[-6:] if msg['agent'] == agent_name]
-            for msg in recent_history:
-                messages.append({"role": "user", "content": msg['message']})
-                messages.append({"role": "assistant", "content": msg['response']})
+        for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
         
-        # Add current message
-        messages.append({"role": "user", "content": user_message})
+    except Exception as e:
+        logger.error(f"Error in chat: {str(e)}")
+        yield f"❌ Error: {str(e)}"
+
+def ask_agents(user_message: str, agents: Dict[str, Optional[Dict]]) -> Dict[str, str]:
+    """Ask several agents the same question concurrently; total wait is the slowest reply, not the sum"""
+    api_key = _resolve_api_key()
+    if not api_key:
+        return {name: "⚠️ OpenAI API key not configured. Please add your API key to Streamlit secrets or environment variables to continue." for name in agents}
+    
+    # Requests are built up front: they read session state, which belongs to this script thread
+    requests_by_agent = {name: build_chat_request(user_message, name, agent) for name, agent in agents.items()}
+    
+    async def _ask_all() -> List:
+        # The async client's connection pool is tied to its event loop, so it lives for this one batch
+        from openai import AsyncOpenAI
+        async with AsyncOpenAI(api_key=api_key) as client:
+            return await asyncio.gather(
+                *(client.chat.completions.create(**request) for request in requests_by_agent.values()),
+                return_exceptions=True
+            )
+    
+    answers = {}
+    for name, result in zip(requests_by_agent, asyncio.run(_ask_all())):
+        if isinstance(result, Exception):
+            logger.error(f"Error asking {name}: {str(result)}")
+            answers[name] = f"❌ Error: {str(result)}"
+        else:
+            answers[name] = result.choices[0].message.content
+    return answers
+
+# Output tokens budgeted per quick action; a request never asks for more than the model can return
+QUICK_ACTION_TOKENS = 1500
+MODEL_MAX_OUTPUT_TOKENS = 16384
+QUICK_ACTIONS_PER_REQUEST = MODEL_MAX_OUTPUT_TOKENS // QUICK_ACTION_TOKENS
+
+def run_quick_actions(actions: List[str], agent_name: str, agent: Dict) -> List[str]:
+    """Answer quick actions in as few API calls as fit the output limit, returning one reply per action"""
+    client, api_key = initialize_openai()
+    
+    if not client:
+        return ["⚠️ OpenAI API key not configured. Please add your API key to Streamlit secrets or environment variables to continue."] * len(actions)
+    
+    answers = []
+    for start in range(0, len(actions), QUICK_ACTIONS_PER_REQUEST):
+        answers.extend(_quick_action_batch(client, actions[start:start + QUICK_ACTIONS_PER_REQUEST], agent_name, agent))
+    return answers
+
+def _quick_action_batch(client: "OpenAI", actions: List[str], agent_name: str, agent: Dict) -> List[str]:
+    """Answer one batch of quick actions with a single JSON-mode call"""
+    try:
+        questions = "\n".join(f"{i}. Help me with: {action}" for i, action in enumerate(actions, 1))
+        batch_prompt = (
+            f"Answer each of the following {len(actions)} questions.\n{questions}\n\n"
+            'Return a JSON object of the form {"answers": ["...", ...]} with one answer per question, in order.'
+        )
         
+        system_prompt = agent_system_prompt(agent_name, agent)
         response = client.chat.completions.create(
-            model="gpt-4",
-            messages=messages,
+            model=resolve_model(agent),
+            messages=[
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": batch_prompt}
+            ],
             temperature=agent.get('temperature', 0.7),
-            max_tokens=1500
+            max_tokens=min(QUICK_ACTION_TOKENS * len(actions), MODEL_MAX_OUTPUT_TOKENS),
+            response_format={"type": "json_object"},
+            extra_body=_prompt_cache_body(system_prompt)
         )
         
-        return response.choices[0].message.content
+        answers = json.loads(response.choices[0].message.content).get('answers', [])
+        if len(answers) != len(actions):
+            raise ValueError(f"expected {len(actions)} answers, got {len(answers)}")
+        return [str(answer) for answer in answers]
         
     except Exception as e:
-        logger.error(f"Error in chat: {str(e)}")
-        return f"❌ Error: {str(e)}"
+        logger.error(f"Error running quick actions: {str(e)}")
+        return [f"❌ Error: {str(e)}"] * len(actions)
 
 # ======================================================
 # 🔐 SIMPLE AUTHENTICATION SYSTEM
 # ======================================================
 
+def _uid(email: str) -> str:
+    """Stable user id for an email; built-in hash() is salted per process so ids would change on restart"""
+    return "user_" + hashlib.sha256(email.strip().lower().encode()).hexdigest()[:16]
+
 def simple_auth():
     """Simple authentication system for demo purposes"""
     return {
-        'sign_in': lambda email, password: {'success': True, 'message': 'Signed in successfully!', 'user': {'id': f"user_{hash(email)}", 'email': email}},
+        'sign_in': lambda email, password: {'success': True, 'message': 'Signed in successfully!', 'user': {'id': _uid(email), 'email': email}},
         'sign_up': lambda email, password: {'success': True, 'message': 'Account created successfully! You can now sign in.'},
         'sign_out': lambda: {'success': True, 'message': 'Signed out successfully!'},
         'reset_password': lambda email: {'success': True, 'message': 'Password reset link sent to your email!'},
@@ -604,18 +814,83 @@ auth = simple_auth()
 # 📱 SESSION STATE MANAGEMENT
 # ======================================================
 
+@dataclass(frozen=True, slots=True)
+class ChatMsg:
+    """One chat turn; slots keep long histories small and attribute reads cheap"""
+    agent: str
+    message: str
+    response: str
+    ts: float
+    
+    @property
+    def timestamp(self) -> str:
+        """Display form of the turn's time"""
+        return datetime.fromtimestamp(self.ts).strftime("%Y-%m-%d %H:%M:%S")
+
+# Chat history log kept column-wise (one ring buffer per field) so exports and analytics
+# read a single column instead of every turn; bounded so long sessions keep bounded memory
+CHAT_HISTORY_MAXLEN = 200
+HISTORY_COLUMNS = ('message', 'response', 'agent', 'timestamp')
+# Turns per agent sent back to the model as context, and the token budget they share
+AGENT_CONTEXT_TURNS = 3
+AGENT_CONTEXT_TOKEN_BUDGET = 3000
+# Turns drawn on the chat page; kept in their own buffer so rendering never slices the log
+CHAT_DISPLAY_MAXLEN = 10
+
+@st.cache_resource
+def _token_encoding():
+    """Tokenizer for the gpt-4o family, loaded once per process"""
+    import tiktoken
+    return tiktoken.get_encoding("o200k_base")
+
+def _new_history() -> Dict[str, deque]:
+    """Empty column-wise chat history log"""
+    return {column: deque(maxlen=CHAT_HISTORY_MAXLEN) for column in HISTORY_COLUMNS}
+
+def _new_stats() -> Dict:
+    """Running session stats, updated as turns are recorded so reads are O(1)"""
+    return {'messages': 0, 'agent_counter': Counter(), 'custom_bots': None}
+
+def record_chat_turn(message: str, response: str, agent_name: str):
+    """Append a turn to the history log, the display window and the agent's context window"""
+    turn = ChatMsg(agent_name, message, response, time.time())
+    for column, value in zip(HISTORY_COLUMNS, (message, response, agent_name, turn.timestamp)):
+        st.session_state.chat_history[column].append(value)
+    st.session_state.chat_display.append(turn)
+    stats = st.session_state.stats
+    stats['messages'] += 1
+    stats['agent_counter'][agent_name] += 1
+    
+    # Each context entry carries its token count, counted once here, so trimming to the
+    # budget never re-encodes older turns; the newest turn is always kept
+    encoding = _token_encoding()
+    tokens = len(encoding.encode(message)) + len(encoding.encode(response))
+    window = st.session_state.per_agent_history[agent_name]
+    window.append((message, response, tokens))
+    while len(window) > 1 and sum(entry[2] for entry in window) > AGENT_CONTEXT_TOKEN_BUDGET:
+        window.popleft()
+
+def clear_chat_history():
+    """Clear the history log, the display window and every agent's context window"""
+    st.session_state.chat_history = _new_history()
+    st.session_state.chat_display.clear()
+    st.session_state.per_agent_history.clear()
+    st.session_state.stats = _new_stats()
+
 def init_session_state():
     """Initialize session state variables"""
     defaults = {
         'authenticated': False,
         'user_email': None,
         'user_id': None,
-        'chat_history': [],
+        'chat_history': _new_history(),
+        'chat_display': deque(maxlen=CHAT_DISPLAY_MAXLEN),
+        'per_agent_history': defaultdict(lambda: deque(maxlen=AGENT_CONTEXT_TURNS)),
+        'stats': _new_stats(),
+        'bots_version': 0,
         'selected_agent': "Startup Strategist",
         'auth_mode': "login",
         'current_page': "Chat",
-        'custom_bots': {},
-        'chat_input': '',
         'sidebar_state': "expanded"  # Add explicit sidebar state
     }
     
@@ -640,70 +915,76 @@ def display_sidebar():
     """Display the sidebar with navigation and agent selection"""
     # Ensure sidebar stays visible with explicit container
     with st.sidebar:
-        st.markdown('<div class="sidebar-content">', unsafe_allow_html=True)
-        
-        # Logo at top of sidebar
-        display_logo()
-        
-        # User info section
-        st.markdown(f"""
-        <div class="sidebar-section">
-            <h3 style="margin: 0; color: #667eea;">👤 Welcome!</h3>
-            <p style="margin: 5px 0;"><strong>Email:</strong> {st.session_state.user_email}</p>
-            <p style="margin: 5px 0; color: #28a745;"><strong>Status:</strong> ✅ Online</p>
-        </div>
-        """, unsafe_allow_html=True)
-        
-        st.divider()
-        
-        # Page navigation
-        display_page_navigation()
-        
-        st.divider()
-        
-        # Agent selector (only show on chat page)
-        if st.session_state.current_page == "Chat":
-            display_agent_selector()
-            st.divider()
-        
-        # Session statistics
-        st.markdown("""
-        <div class="sidebar-section">
-            <h3 style="margin: 0; color: #667eea;">📊 Session Stats</h3>
-        </div>
-        """, unsafe_allow_html=True)
-        
-        # Create metrics in columns for better layout
-        col1, col2 = st.columns(2)
-        with col1:
-            total_messages = len(st.session_state.chat_history)
-            st.metric("Messages", total_messages)
-        
-        with col2:
-            total_custom_bots = len(load_custom_bots(st.session_state.user_id))
-            st.metric("Custom Bots", total_custom_bots)
-        
-        if st.session_state.chat_history:
-            agents_used = len(set(msg['agent'] for msg in st.session_state.chat_history))
-            st.metric("Agents Used", agents_used)
-        
+        _sidebar_fragment()
+
+def display_session_counters():
+    """Messages sent and agents used this session"""
+    col1, col2 = st.columns(2)
+    with col1:
+        st.metric("Messages", st.session_state.stats['messages'])
+    with col2:
+        st.metric("Agents Used", len(st.session_state.stats['agent_counter']))
+
+@st.fragment
+def _sidebar_fragment():
+    """Sidebar body; its own widgets rerun only this fragment, anything app-wide calls st.rerun()"""
+    st.markdown('<div class="sidebar-content">', unsafe_allow_html=True)
+    
+    # Logo at top of sidebar
+    display_logo()
+    
+    # User info section
+    st.markdown(f"""
+    <div class="sidebar-section">
+        <h3 style="margin: 0; color: #667eea;">👤 Welcome!</h3>
+        <p style="margin: 5px 0;"><strong>Email:</strong> {st.session_state.user_email}</p>
+        <p style="margin: 5px 0; color: #28a745;"><strong>Status:</strong> ✅ Online</p>
+    </div>
+    """, unsafe_allow_html=True)
+    
+    st.divider()
+    
+    # Page navigation
+    display_page_navigation()
+    
+    st.divider()
+    
+    # Agent selector (only show on chat page)
+    if st.session_state.current_page == "Chat":
+        display_agent_selector()
         st.divider()
+    
+    # Session statistics
+    st.markdown("""
+    <div class="sidebar-section">
+        <h3 style="margin: 0; color: #667eea;">📊 Session Stats</h3>
+    </div>
+    """, unsafe_allow_html=True)
+    
+    # On the chat page the conversation counters are drawn by the chat fragment instead, since
+    # sending reruns only that fragment and would leave copies here stale
+    if st.session_state.current_page != "Chat":
+        display_session_counters()
+    
+    total_custom_bots = custom_bot_count(st.session_state.user_id)
+    st.metric("Custom Bots", total_custom_bots)
+    
+    st.divider()
+    
+    # Logout button at bottom
+    if st.button("🚪 Logout", type="secondary", use_container_width=True):
+        # Clear authentication state
+        st.session_state.authenticated = False
+        st.session_state.user_email = None
+        st.session_state.user_id = None
+        clear_chat_history()
+        st.session_state.current_page = "Chat"
+        st.session_state.selected_agent = "Startup Strategist"
         
-        # Logout button at bottom
-        if st.button("🚪 Logout", type="secondary", use_container_width=True):
-            # Clear authentication state
-            st.session_state.authenticated = False
-            st.session_state.user_email = None
-            st.session_state.user_id = None
-            st.session_state.chat_history = []
-            st.session_state.current_page = "Chat"
-            st.session_state.selected_agent = "Startup Strategist"
-            
-            st.success("Logged out successfully!")
-            time.sleep(1)
-            st.rerun()
-        
-        st.markdown('</div>', unsafe_allow_html=True)
+        st.toast("Logged out successfully!", icon="✅")
+        st.rerun()
+    
+    st.markdown('</div>', unsafe_allow_html=True)
 
 def display_page_navigation():
     """Display page navigation in sidebar"""
@@ -719,10 +1000,54 @@ def display_page_navigation():
         label_visibility="collapsed"
     )
     
+    # The radio only reruns the sidebar fragment; promote a page change to a single app rerun
     if selected_page != st.session_state.current_page:
         st.session_state.current_page = selected_page
         st.rerun()
 
+# Sidebar agent cards; the custom variant swaps the gradient and adds a badge
+_AGENT_CARD_STD = """
+<div style="background: linear-gradient(135deg, #667eea 0%, #764ba2 100%); 
+            color: white; 
+            padding: 15px; 
+            border-radius: 10px; 
+            margin: 10px 0; 
+            font-size: 0.9em;
+            text-align: center;">
+    <div style="font-size: 1.8em; margin-bottom: 8px;">{emoji}</div>
+    <div style="font-weight: bold; margin-bottom: 5px;">{name}</div>
+    <div style="font-size: 0.8em; margin-top: 8px; opacity: 0.9;">
+        {specialties}
+    </div>
+</div>
+"""
+
+_AGENT_CARD_CUSTOM = """
+<div style="background: linear-gradient(135deg, #ffeaa7 0%, #fab1a0 100%); 
+            color: #2d3436; 
+            padding: 15px; 
+            border-radius: 10px; 
+            margin: 10px 0; 
+            font-size: 0.9em;
+            text-align: center;">
+    <div style="font-size: 1.8em; margin-bottom: 8px;">{emoji}</div>
+    <div style="font-weight: bold; margin-bottom: 5px;">{name}</div>
+    <div style="font-size: 0.8em; opacity: 0.9;">✨ Custom Bot</div>
+    <div style="font-size: 0.8em; margin-top: 8px; opacity: 0.9;">
+        {specialties}
+    </div>
+</div>
+"""
+
+@st.cache_data(max_entries=64, show_spinner=False)
+def _group_by_category(bots_signature: Tuple[Tuple[str, str], ...]) -> Dict[str, List[str]]:
+    """Map each category to its agent names, in first-seen order"""
+    categories = {}
+    for agent_name, category in bots_signature:
+        categories.setdefault(category, []).append(agent_name)
+    return categories
+
+@st.fragment
 def display_agent_selector():
     """Display agent selection interface"""
     st.markdown("**🤖 AI Assistant**")
@@ -730,19 +1055,19 @@ def display_agent_selector():
     # Get all bots for current user
     all_bots = get_all_bots(st.session_state.user_id)
     
-    # Group agents by category
-    categories = {}
-    for agent_name, agent_info in all_bots.items():
-        category = agent_info.get('category', 'Other')
-        if category not in categories:
-            categories[category] = []
-        categories[category].append(agent_name)
+    # Group agents by category (cached on the name/category pairs, so only bot changes regroup)
+    categories = _group_by_category(tuple((name, info.get('category', 'Other')) for name, info in all_bots.items()))
+    
+    # Category selector, bound to session state; when it isn't set yet (first visit, or coming back
+    # from another page) it opens on the selected agent's category instead of the first one
+    if st.session_state.get('selected_category') not in categories:
+        agent_category = all_bots.get(st.session_state.selected_agent, {}).get('category', 'Other')
+        st.session_state.selected_category = agent_category if agent_category in categories else next(iter(categories), None)
     
-    # Category selector
     selected_category = st.selectbox(
         "Category:",
         list(categories.keys()),
-        index=0 if categories else None
+        key="selected_category"
     )
     
     if selected_category:
@@ -760,7 +1085,8 @@ def display_agent_selector():
             index=current_index
         )
         
-        # Update session state if changed
+        # Update session state if changed; the selector is a fragment, so this promotes to one app rerun.
+        # Not bound with key="selected_agent": Streamlit drops widget keys on pages where the widget isn't drawn
         if selected_agent != st.session_state.selected_agent:
             st.session_state.selected_agent = selected_agent
             st.rerun()
@@ -773,32 +1099,41 @@ def display_agent_selector():
             is_custom = agent_info.get('is_custom', False)
             emoji = agent_info.get('emoji', '🤖')
             
-            st.markdown(f"""
-            <div style="background: {'linear-gradient(135deg, #ffeaa7 0%, #fab1a0 100%)' if is_custom else 'linear-gradient(135deg, #667eea 0%, #764ba2 100%)'}; 
-                        color: {'#2d3436' if is_custom else 'white'}; 
-                        padding: 15px; 
-                        border-radius: 10px; 
-                        margin: 10px 0; 
-                        font-size: 0.9em;
-                        text-align: center;">
-                <div style="font-size: 1.8em; margin-bottom: 8px;">{emoji}</div>
-                <div style="font-weight: bold; margin-bottom: 5px;">{selected_agent}</div>
-                {f'<div style="font-size: 0.8em; opacity: 0.9;">✨ Custom Bot</div>' if is_custom else ''}
-                <div style="font-size: 0.8em; margin-top: 8px; opacity: 0.9;">
-                    {', '.join(agent_info.get('specialties', [])[:2])}
-                </div>
-            </div>
-            """, unsafe_allow_html=True)
+            card_template = _AGENT_CARD_CUSTOM if is_custom else _AGENT_CARD_STD
+            st.markdown(card_template.format_map({
+                'emoji': emoji,
+                'name': selected_agent,
+                'specialties': agent_info.get('_specialties_str', '')
+            }), unsafe_allow_html=True)
             
-            # Quick actions as small buttons
+            # Advanced: opt into a different model for this conversation
+            with st.expander("⚙️ Advanced"):
+                st.selectbox(
+                    "Model:",
+                    MODEL_OVERRIDE_OPTIONS,
+                    index=MODEL_OVERRIDE_OPTIONS.index(st.session_state.get('model_choice', "Agent default")),
+                    key="model_override_widget",
+                    on_change=_store_model_choice,
+                    help=f"Agent default uses {agent_info.get('model', DEFAULT_MODEL)} for {selected_agent}"
+                )
+            
+            # Quick actions run together in one batched request
             if agent_info.get('quick_actions'):
                 st.markdown("**⚡ Quick Actions:**")
-                for i, action in enumerate(agent_info['quick_actions'][:3]):  # Limit to 3 for space
-                    if st.button(action, key=f"sidebar_action_{action}_{i}", use_container_width=True):
-                        st.session_state.chat_input = f"Help me with: {action}"
-                        if st.session_state.current_page != "Chat":
-                            st.session_state.current_page = "Chat"
-                        st.rerun()
+                selected_actions = st.multiselect(
+                    "Run actions",
+                    agent_info['quick_actions'],
+                    key=f"quick_actions_{selected_agent}",
+                    label_visibility="collapsed",
+                    placeholder="Pick one or more actions"
+                )
+                if st.button("⚡ Run", key="run_quick_actions", disabled=not selected_actions, use_container_width=True):
+                    with st.spinner(f"{selected_agent} is working on {len(selected_actions)} action(s)..."):
+                        answers = run_quick_actions(selected_actions, selected_agent, agent_info)
+                    for action, answer in zip(selected_actions, answers):
+                        record_chat_turn(f"Help me with: {action}", answer, selected_agent)
+                    # Widgets here only rerun the sidebar fragment; promote to one app rerun to show the replies
+                    st.rerun()
 
 # ======================================================
 # 🔐 AUTHENTICATION UI
@@ -861,10 +1196,9 @@ def login_section():
                 if result['success']:
                     st.session_state.authenticated = True
                     st.session_state.user_email = email
-                    st.session_state.user_id = result['user'].get('id', f"user_{hash(email)}")
+                    st.session_state.user_id = result['user'].get('id', _uid(email))
                     st.session_state.sidebar_state = "expanded"  # Ensure sidebar is expanded after login
-                    st.success(result['message'])
-                    time.sleep(1)
+                    st.toast(result['message'], icon="✅")
                     st.rerun()
                 else:
                     st.error(result['error'])
@@ -948,83 +1282,99 @@ def display_chat_page():
         </div>
         """, unsafe_allow_html=True)
     
+    # History and message box rerun on their own when a message is sent or history is cleared
+    _chat_fragment(all_bots, current_agent)
+
+@st.fragment
+def _chat_fragment(all_bots: Mapping[str, Dict], current_agent: Optional[Dict]):
+    """Conversation history and message input; reruns without redrawing the header or sidebar"""
+    # Counters live here so fragment reruns after a send keep them current
+    display_session_counters()
+    
     # Chat history display
-    if st.session_state.chat_history:
+    if st.session_state.chat_display:
         st.markdown("### 📜 Conversation History")
         
-        # Show recent messages (last 10)
-        recent_messages = st.session_state.chat_history[-10:]
+        # Avatars looked up once per render rather than per message
+        emoji_by_agent = {name: bot.get('emoji', '🤖') for name, bot in all_bots.items()}
         
-        for i, msg in enumerate(recent_messages):
+        # Show recent messages (the display window holds the last 10)
+        for msg in st.session_state.chat_display:
             # User message
-            st.markdown(f"""
-            <div class="user-message">
-                <strong>You:</strong> {msg['message']}
-                <div style="font-size: 0.8em; opacity: 0.7; margin-top: 8px;">
-                    💬 To: {msg['agent']} | 🕐 {msg['timestamp']}
-                </div>
-            </div>
-            """, unsafe_allow_html=True)
+            with st.chat_message("user", avatar="🧑"):
+                st.markdown(msg.message)
+                st.caption(f"💬 To: {msg.agent} · 🕐 {msg.timestamp}")
             
             # Agent response
-            st.markdown(f"""
-            <div class="assistant-message">
-                <strong>{msg['agent']} {all_bots.get(msg['agent'], {}).get('emoji', '🤖')}:</strong><br/>
-                {msg['response']}
-            </div>
-            """, unsafe_allow_html=True)
+            with st.chat_message("assistant", avatar=emoji_by_agent.get(msg.agent, '🤖')):
+                st.markdown(f"**{msg.agent}:**")
+                st.markdown(msg.response)
         
         # Clear history button
         col1, col2, col3 = st.columns([2, 1, 2])
         with col2:
             if st.button("🗑️ Clear History", type="secondary"):
-                st.session_state.chat_history = []
-                st.success("Chat history cleared!")
+                clear_chat_history()
+                st.toast("Chat history cleared!", icon="✅")
+                # Rare, so a full rerun is fine and resets everything derived from the history
                 st.rerun()
     
     # Chat input section
     st.markdown("### 💭 Send a Message")
     
-    # Use session state for input if set by quick actions
-    default_input = st.session_state.get('chat_input', '')
-    if default_input:
-        st.session_state.chat_input = ''  # Clear after use
-    
-    # Create columns for input and send button
-    col1, col2 = st.columns([4, 1])
-    
-    with col1:
-        user_input = st.text_area(
-            f"Message {st.session_state.selected_agent}:",
-            value=default_input,
-            height=120,
-            placeholder=f"Ask {st.session_state.selected_agent} for business advice, strategy, or specific help...",
-            key="chat_text_input"
+    # Typing and picking agents don't rerun anything; the whole form is submitted at once
+    with st.form("chat_form", clear_on_submit=True):
+        # Optionally put the same question to other agents in parallel
+        compare_agents = st.multiselect(
+            "Also ask:",
+            [name for name in all_bots if name != st.session_state.selected_agent],
+            key="compare_agents",
+            placeholder="Compare answers from other agents (optional)"
         )
-    
-    with col2:
-        st.markdown("<br/>", unsafe_allow_html=True)  # Add some spacing
-        send_button = st.button("📤 Send", type="primary", use_container_width=True)
+        
+        # Create columns for input and send button
+        col1, col2 = st.columns([4, 1])
+        
+        with col1:
+            user_input = st.text_area(
+                f"Message {st.session_state.selected_agent}:",
+                height=120,
+                placeholder=f"Ask {st.session_state.selected_agent} for business advice, strategy, or specific help...",
+                key="chat_text_input"
+            )
+        
+        with col2:
+            st.markdown("<br/>", unsafe_allow_html=True)  # Add some spacing
+            send_button = st.form_submit_button("📤 Send", type="primary", use_container_width=True)
     
     # Handle message sending
-    if send_button or (user_input and st.session_state.get('send_message', False)):
-        if user_input.strip():
-            with st.spinner(f"🤔 {st.session_state.selected_agent} is thinking..."):
-                # Add a small delay for better UX
-                time.sleep(0.5)
-                response = chat_with_agent(user_input, st.session_state.selected_agent, st.session_state.user_id)
-                
-                # Add to chat history
-                st.session_state.chat_history.append({
-                    'message': user_input,
-                    'response': response,
-                    'agent': st.session_state.selected_agent,
-                    'timestamp': datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                })
-                
-                # Clear the input and rerun
-                st.session_state.send_message = False
-                st.rerun()
+    if send_button:
+        if user_input.strip() and compare_agents:
+            agents = {st.session_state.selected_agent: current_agent}
+            agents.update((name, all_bots.get(name)) for name in compare_agents)
+            
+            with st.spinner(f"Asking {len(agents)} agents..."):
+                responses = ask_agents(user_input, agents)
+            
+            for agent_name, response in responses.items():
+                record_chat_turn(user_input, response, agent_name)
+            
+            st.rerun(scope="fragment")
+        elif user_input.strip():
+            # Show the turn as chat bubbles; only the assistant bubble changes as tokens arrive
+            with st.chat_message("user", avatar="🧑"):
+                st.markdown(user_input)
+            with st.chat_message("assistant", avatar=(current_agent or {}).get('emoji', '🤖')):
+                st.markdown(f"**{st.session_state.selected_agent}:**")
+                response = st.write_stream(
+                    chat_with_agent(user_input, st.session_state.selected_agent, current_agent)
+                )
+            
+            # Add to chat history
+            record_chat_turn(user_input, response, st.session_state.selected_agent)
+            
+            # Clear the input and rerun
+            st.rerun(scope="fragment")
         else:
             st.warning("⚠️ Please enter a message before sending")
 
@@ -1115,8 +1465,8 @@ def create_custom_bot_form():
                     return
                 
                 # Process specialties and quick actions
-                specialties = [s.strip() for s in specialties_input.split(',') if s.strip()]
-                quick_actions = [a.strip() for a in quick_actions_input.split(',') if a.strip()]
+                specialties = [s for s in (part.strip() for part in specialties_input.split(',')) if s]
+                quick_actions = [a for a in (part.strip() for part in quick_actions_input.split(',')) if a]
                 
                 bot_data = {
                     'description': bot_description,
@@ -1129,15 +1479,19 @@ def create_custom_bot_form():
                 }
                 
                 if save_custom_bot(st.session_state.user_id, bot_name, bot_data):
-                    st.success(f"✅ Custom bot '{bot_name}' created successfully!")
-                    st.balloons()
-                    time.sleep(2)
+                    st.toast(f"Custom bot '{bot_name}' created successfully!", icon="🎉")
                     st.rerun()
                 else:
                     st.error("❌ Failed to create custom bot. Please try again.")
             else:
                 st.error("⚠️ Please fill in all required fields (marked with *)")
 
+def _open_chat_with(bot_name: str):
+    """Button callback: switch to the chat page with the given bot selected"""
+    st.session_state.selected_agent = bot_name
+    st.session_state.current_page = "Chat"
+    st.toast(f"Switched to {bot_name}!", icon="💬")
+
 def display_existing_custom_bots():
     """Display existing custom bots"""
     st.subheader("🤖 Your Custom AI Assistants")
@@ -1180,27 +1534,39 @@ def display_existing_custom_bots():
                 with col2:
                     st.markdown("**Actions:**")
                     
-                    # Test bot button
-                    if st.button(f"💬 Chat", key=f"test_{bot_name}", use_container_width=True):
-                        st.session_state.selected_agent = bot_name
-                        st.session_state.current_page = "Chat"
-                        st.success(f"Switched to {bot_name}!")
-                        time.sleep(1)
-                        st.rerun()
+                    # Test bot button; the callback runs before the rerun the click already triggers
+                    st.button(
+                        f"💬 Chat",
+                        key=f"test_{bot_name}",
+                        use_container_width=True,
+                        on_click=_open_chat_with,
+                        args=(bot_name,)
+                    )
                     
                     # Delete bot button
                     if st.button(f"🗑️ Delete", key=f"delete_{bot_name}", type="secondary", use_container_width=True):
                         if delete_custom_bot(st.session_state.user_id, bot_name):
-                            st.success(f"✅ Deleted '{bot_name}'")
-                            time.sleep(1)
+                            st.toast(f"Deleted '{bot_name}'", icon="✅")
                             st.rerun()
                         else:
                             st.error("❌ Failed to delete bot")
                 
-                # Show system prompt in expandable section
-                with st.expander("🧠 View System Prompt"):
+                # System prompt is only sent to the browser while its toggle is on
+                if st.toggle("🧠 View System Prompt", key=f"show_prompt_{bot_name}"):
                     st.code(bot_data.get('system_prompt', 'No system prompt defined'), language='text')
 
+@functools.cache
+def _plotly():
+    """Import plotly.express on first use; it is only needed for profile charts"""
+    import plotly.express as px
+    return px
+
+@st.cache_data(max_entries=8, show_spinner=False)
+def _export_csv(columns: Tuple[Tuple[str, ...], ...]) -> str:
+    """CSV of the history columns in HISTORY_COLUMNS order; unchanged history reuses the last export"""
+    import pandas as pd
+    return pd.DataFrame(dict(zip(HISTORY_COLUMNS, columns))).to_csv(index=False)
+
 def display_user_profile_page():
     """Display user profile and settings page"""
     st.markdown("""
@@ -1229,9 +1595,9 @@ def display_user_profile_page():
     with col2:
         st.subheader("📊 Usage Statistics")
         
-        total_custom_bots = len(load_custom_bots(st.session_state.user_id))
-        total_messages = len(st.session_state.chat_history)
-        agents_used = len(set(msg['agent'] for msg in st.session_state.chat_history)) if st.session_state.chat_history else 0
+        total_custom_bots = custom_bot_count(st.session_state.user_id)
+        total_messages = st.session_state.stats['messages']
+        agents_used = len(st.session_state.stats['agent_counter'])
         
         # Display metrics in a nice card
         st.markdown(f"""
@@ -1264,16 +1630,20 @@ def display_user_profile_page():
     with col1:
         st.markdown("**💬 Chat Management**")
         if st.button("🗑️ Clear Chat History", type="secondary", use_container_width=True):
-            st.session_state.chat_history = []
-            st.success("✅ Chat history cleared!")
-            st.rerun()
+            # Only rerun when there is something to clear
+            if st.session_state.chat_history['message']:
+                clear_chat_history()
+                st.toast("Chat history cleared!", icon="✅")
+                st.rerun()
+            else:
+                st.info("No chat history to clear.")
     
     with col2:
         st.markdown("**🤖 Bot Management**")
         if st.button("⚠️ Delete All Custom Bots", type="secondary", use_container_width=True):
-            if st.session_state.user_id in st.session_state.get('custom_bots', {}):
-                st.session_state.custom_bots[st.session_state.user_id] = {}
-                st.success("✅ All custom bots deleted!")
+            if load_custom_bots(st.session_state.user_id):
+                delete_all_custom_bots(st.session_state.user_id)
+                st.toast("All custom bots deleted!", icon="✅")
                 st.rerun()
             else:
                 st.info("No custom bots to delete.")
@@ -1281,10 +1651,9 @@ def display_user_profile_page():
     with col3:
         st.markdown("**📊 Export Data**")
         if st.button("💾 Export Chat History", type="secondary", use_container_width=True):
-            if st.session_state.chat_history:
-                # Convert chat history to DataFrame
-                df = pd.DataFrame(st.session_state.chat_history)
-                csv = df.to_csv(index=False)
+            if st.session_state.chat_history['message']:
+                # Convert chat history to CSV (cached on the history's contents)
+                csv = _export_csv(tuple(tuple(column) for column in st.session_state.chat_history.values()))
                 
                 st.download_button(
                     label="📥 Download CSV",
@@ -1296,17 +1665,17 @@ def display_user_profile_page():
                 st.info("No chat history to export.")
     
     # Quick stats visualization
-    if st.session_state.chat_history:
+    history = st.session_state.chat_history
+    if history['message']:
         st.markdown("---")
         st.subheader("📈 Activity Overview")
         
-        # Agent usage chart
-        agent_counts = {}
-        for msg in st.session_state.chat_history:
-            agent = msg['agent']
-            agent_counts[agent] = agent_counts.get(agent, 0) + 1
+        # Agent usage is kept up to date per turn; per-day counts scan the timestamp column's date prefix
+        agent_counts = st.session_state.stats['agent_counter']
+        daily_counts = Counter(timestamp[:10] for timestamp in history['timestamp'])
         
         if agent_counts:
+            px = _plotly()
             col1, col2 = st.columns(2)
             
             with col1:
@@ -1320,11 +1689,9 @@ def display_user_profile_page():
             
             with col2:
                 # Messages over time (by day)
-                df_history = pd.DataFrame(st.session_state.chat_history)
-                df_history['date'] = pd.to_datetime(df_history['timestamp']).dt.date
-                daily_counts = df_history.groupby('date').size().reset_index(name='messages')
+                dates, counts = zip(*sorted(daily_counts.items()))
                 
-                fig = px.bar(daily_counts, x='date', y='messages', title="Messages per Day")
+                fig = px.bar(x=dates, y=counts, labels={'x': 'date', 'y': 'messages'}, title="Messages per Day")
                 fig.update_layout(height=400)
                 st.plotly_chart(fig, use_container_width=True)
 
@@ -1338,38 +1705,7 @@ def main():
     
     # Add JavaScript to monitor sidebar state
     if st.session_state.authenticated:
-        sidebar_monitor_js = """
-        <script>
-        // Monitor and maintain sidebar visibility after login
-        function maintainSidebar() {
-            const sidebar = document.querySelector('section[data-testid="stSidebar"]');
-            if (sidebar) {
-                // Force sidebar to be visible and expanded
-                sidebar.style.width = '300px';
-                sidebar.style.minWidth = '300px';
-                sidebar.style.maxWidth = '300px';
-                sidebar.style.display = 'block';
-                sidebar.style.visibility = 'visible';
-                sidebar.style.opacity = '1';
-                
-                // Hide the collapse button to prevent accidental hiding
-                const collapseBtn = document.querySelector('button[data-testid="collapsedControl"]');
-                if (collapseBtn) {
-                    collapseBtn.style.display = 'none';
-                }
-            }
-        }
-        
-        // Run immediately and then every 100ms to ensure sidebar stays visible
-        maintainSidebar();
-        setInterval(maintainSidebar, 100);
-        
-        // Also run when DOM changes (for when Streamlit re-renders)
-        const observer = new MutationObserver(maintainSidebar);
-        observer.observe(document.body, { childList: true, subtree: true });
-        </script>
-        """
-        st.markdown(sidebar_monitor_js, unsafe_allow_html=True)
+        components.html(SIDEBAR_MONITOR_JS, height=0)
     
     if not st.session_state.authenticated:
         login_form()
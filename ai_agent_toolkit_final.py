@@ -7,24 +7,30 @@ personalization features, and modern UI.
 """
 
 import streamlit as st
-from openai import OpenAI
+from openai import OpenAI, AsyncOpenAI
 import tiktoken
 from datetime import datetime, timedelta
 import json
+import re
+import string
 import time
-from typing import Dict, List, Tuple, Optional, Any
+import asyncio
+import concurrent.futures
+import threading
+import queue
+from typing import Dict, List, Tuple, Optional, Any, Mapping, Iterator
 import logging
 import hashlib
 import os
-import pandas as pd
-import io
-import base64
-import requests
-from PIL import Image
-import plotly.express as px
-import plotly.graph_objects as go
-from plotly.subplots import make_subplots
-import uuid
+import sys
+import gc
+import functools
+import sqlite3
+from collections import ChainMap, OrderedDict, defaultdict, deque
+from dataclasses import dataclass
+from itertools import islice
+from types import MappingProxyType
+import numpy as np
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -56,9 +62,17 @@ header {visibility: hidden;}
 .stDeployButton {display:none;}
 .stDecoration {display:none;}
 
+/* Shared palette */
+:root {
+    --brand-gradient: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
+    --brand-gradient-reverse: linear-gradient(135deg, #764ba2 0%, #667eea 100%);
+    --brand: #667eea;
+    --card-shadow: 0 2px 10px rgba(0,0,0,0.1);
+}
+
 /* Custom styling for AI Agent Toolkit */
 .main-header {
-    background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
+    background: var(--brand-gradient);
     color: white;
     padding: 20px;
     border-radius: 15px;
@@ -73,8 +87,8 @@ header {visibility: hidden;}
     padding: 20px;
     border-radius: 15px;
     margin: 10px 0;
-    border-left: 4px solid #667eea;
-    box-shadow: 0 2px 10px rgba(0,0,0,0.1);
+    border-left: 4px solid var(--brand);
+    box-shadow: var(--card-shadow);
     transition: all 0.3s ease;
 }
 
@@ -90,7 +104,7 @@ header {visibility: hidden;}
     border-radius: 15px;
     margin: 10px 0;
     border-left: 4px solid #e17055;
-    box-shadow: 0 2px 10px rgba(0,0,0,0.1);
+    box-shadow: var(--card-shadow);
     transition: all 0.3s ease;
 }
 
@@ -105,7 +119,7 @@ header {visibility: hidden;}
 }
 
 .user-message {
-    background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
+    background: var(--brand-gradient);
     color: white;
     padding: 15px 20px;
     border-radius: 20px 20px 5px 20px;
@@ -119,12 +133,12 @@ header {visibility: hidden;}
     padding: 15px 20px;
     border-radius: 20px 20px 20px 5px;
     margin: 10px 50px 10px 0;
-    border-left: 4px solid #667eea;
-    box-shadow: 0 2px 10px rgba(0,0,0,0.1);
+    border-left: 4px solid var(--brand);
+    box-shadow: var(--card-shadow);
 }
 
 .feature-button {
-    background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
+    background: var(--brand-gradient);
     color: white;
     border: none;
     padding: 8px 16px;
@@ -143,7 +157,7 @@ header {visibility: hidden;}
 .stButton > button {
     border-radius: 25px;
     border: none;
-    background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
+    background: var(--brand-gradient);
     color: white;
     padding: 10px 20px;
     font-weight: 500;
@@ -151,7 +165,7 @@ header {visibility: hidden;}
 }
 
 .stButton > button:hover {
-    background: linear-gradient(135deg, #764ba2 0%, #667eea 100%);
+    background: var(--brand-gradient-reverse);
     transform: translateY(-2px);
     box-shadow: 0 4px 15px rgba(102, 126, 234, 0.4);
 }
@@ -161,7 +175,7 @@ header {visibility: hidden;}
     padding: 15px;
     border-radius: 15px;
     margin: 15px 0;
-    border-left: 4px solid #667eea;
+    border-left: 4px solid var(--brand);
 }
 
 .metric-display {
@@ -170,10 +184,32 @@ header {visibility: hidden;}
     padding: 15px;
     border-radius: 10px;
     text-align: center;
-    box-shadow: 0 2px 10px rgba(0,0,0,0.1);
+    box-shadow: var(--card-shadow);
     margin: 10px 0;
 }
 
+.sidebar-stats {
+    display: flex;
+    gap: 8px;
+    margin-top: 10px;
+}
+
+.sidebar-stats .stat {
+    flex: 1;
+    text-align: center;
+}
+
+.sidebar-stats .stat-value {
+    display: block;
+    font-size: 1.4em;
+    font-weight: 600;
+}
+
+.sidebar-stats .stat-label {
+    font-size: 0.75em;
+    opacity: 0.7;
+}
+
 /* Logo styling */
 .logo-container {
     display: flex;
@@ -203,7 +239,7 @@ header {visibility: hidden;}
     padding: 15px;
     border-radius: 10px;
     margin: 10px 0;
-    border-left: 4px solid #667eea;
+    border-left: 4px solid var(--brand);
 }
 
 /* Responsive design */
@@ -216,31 +252,115 @@ header {visibility: hidden;}
 </style>
 """
 
-st.markdown(hide_streamlit_style, unsafe_allow_html=True)
+@st.cache_data
+def _css() -> str:
+    """Minify the stylesheet once per process instead of on every rerun"""
+    css = re.sub(r"/\*.*?\*/", "", hide_streamlit_style, flags=re.DOTALL)
+    css = re.sub(r"\s+", " ", css)
+    return re.sub(r"\s*([{};:,>])\s*", r"\1", css).strip()
+
+# Served by Streamlit's static file handler (server.enableStaticServing) so the
+# browser caches the stylesheet instead of receiving it inline on every rerun
+STATIC_CSS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "static", "app.css")
+
+@st.cache_resource
+def _stylesheet_markup() -> str:
+    """Write the stylesheet to the static folder once and return the tag that loads it"""
+    css = _css()
+    if not st.get_option("server.enableStaticServing"):
+        return css
+    
+    stylesheet = css.removeprefix("<style>").removesuffix("</style>")
+    try:
+        os.makedirs(os.path.dirname(STATIC_CSS_PATH), exist_ok=True)
+        with open(STATIC_CSS_PATH, "w") as f:
+            f.write(stylesheet)
+    except OSError as e:
+        logger.error(f"Error writing static stylesheet: {str(e)}")
+        return css
+    
+    # Versioned URL so a changed stylesheet isn't served from the browser cache
+    version = hashlib.blake2b(stylesheet.encode(), digest_size=8).hexdigest()
+    return f'<link rel="stylesheet" href="app/static/app.css?v={version}">'
+
+st.markdown(_stylesheet_markup(), unsafe_allow_html=True)
+
+# ======================================================
+# ⚙️ GARBAGE COLLECTION TUNING
+# ======================================================
+
+# Opt-in: every rerun allocates many short-lived objects, and automatic GC passes
+# over them add rerun jitter. Disabling it trades steadier latency for memory that
+# is only reclaimed by the periodic full collection below.
+GC_COLLECT_INTERVAL_SECONDS = 30
+
+@st.cache_resource
+def configure_gc() -> bool:
+    """Disable automatic GC once per process when AITK_DISABLE_GC=1"""
+    if os.environ.get("AITK_DISABLE_GC") != "1":
+        return False
+    
+    gc.disable()
+    
+    def collect_periodically():
+        while True:
+            time.sleep(GC_COLLECT_INTERVAL_SECONDS)
+            gc.collect(2)
+    
+    threading.Thread(target=collect_periodically, name="gc-collector", daemon=True).start()
+    logger.info(f"Automatic garbage collection disabled; collecting every {GC_COLLECT_INTERVAL_SECONDS}s")
+    return True
+
+configure_gc()
 
 # ======================================================
 # 🔑 API CONFIGURATION
 # ======================================================
 
+# Upper bound on in-flight OpenAI requests for batched agent calls
+MAX_CONCURRENT_REQUESTS = 50
+
+# Model used by agents that don't name one; users can opt into a higher tier in preferences
+DEFAULT_MODEL = "gpt-4o-mini"
+MODEL_OPTIONS = ["Agent default", "gpt-4o-mini", "gpt-4o", "gpt-4"]
+
 def initialize_openai():
-    """Initialize OpenAI client with API key from secrets or environment"""
+    """Return the shared async OpenAI client and its API key"""
+    client = get_openai_client()
+    return client, client.api_key if client else None
+
+@st.cache_resource
+def get_openai_client() -> Optional[AsyncOpenAI]:
+    """Resolve the API key once and build the AsyncOpenAI client shared across reruns"""
     try:
         # Try Streamlit secrets first
         if hasattr(st, 'secrets') and 'OPENAI_API_KEY' in st.secrets:
-            api_key = st.secrets['OPENAI_API_KEY']
-            return OpenAI(api_key=api_key), api_key
+            return AsyncOpenAI(api_key=st.secrets['OPENAI_API_KEY'])
         
         # Fallback to environment variable
         elif 'OPENAI_API_KEY' in os.environ:
-            api_key = os.environ['OPENAI_API_KEY']
-            return OpenAI(api_key=api_key), api_key
+            return AsyncOpenAI(api_key=os.environ['OPENAI_API_KEY'])
         
         # No API key found
-        return None, None
+        return None
         
     except Exception as e:
         logger.error(f"Failed to initialize OpenAI: {str(e)}")
-        return None, None
+        return None
+
+@st.cache_resource
+def get_event_loop() -> asyncio.AbstractEventLoop:
+    """Start the background event loop that runs all async OpenAI calls"""
+    # The async client's connection pool is bound to the loop it first ran on,
+    # so every batch is scheduled onto this single long-lived loop.
+    loop = asyncio.new_event_loop()
+    threading.Thread(target=loop.run_forever, name="openai-event-loop", daemon=True).start()
+    return loop
+
+@st.cache_resource
+def get_request_semaphore() -> asyncio.Semaphore:
+    """Shared semaphore capping concurrent OpenAI requests"""
+    return asyncio.Semaphore(MAX_CONCURRENT_REQUESTS)
 
 # ======================================================
 # 🤖 AI AGENT PERSONALITIES (PREDEFINED)
@@ -253,6 +373,7 @@ BOT_PERSONALITIES = {
         "emoji": "🚀",
         "category": "Entrepreneurship & Startups",
         "temperature": 0.7,
+        "model": "gpt-4o-mini",
         "specialties": ["Business Planning", "MVP Development", "Product-Market Fit", "Growth Hacking"],
         "quick_actions": ["Create Business Plan", "Validate Idea", "Find Co-founder", "Pitch Deck Help"],
         "is_custom": False
@@ -262,6 +383,7 @@ BOT_PERSONALITIES = {
         "emoji": "📝",
         "category": "Entrepreneurship & Startups",
         "temperature": 0.6,
+        "model": "gpt-4o-mini",
         "specialties": ["Business Plans", "Market Analysis", "Financial Projections", "Investor Presentations"],
         "quick_actions": ["Write Executive Summary", "Market Research", "Financial Model", "Competitive Analysis"],
         "is_custom": False
@@ -271,6 +393,7 @@ BOT_PERSONALITIES = {
         "emoji": "💼",
         "category": "Entrepreneurship & Startups",
         "temperature": 0.6,
+        "model": "gpt-4o-mini",
         "specialties": ["Fundraising", "Pitch Decks", "Investor Relations", "Valuation"],
         "quick_actions": ["Create Pitch Deck", "Find Investors", "Prepare Due Diligence", "Valuation Help"],
         "is_custom": False
@@ -282,6 +405,7 @@ BOT_PERSONALITIES = {
         "emoji": "💼",
         "category": "Sales & Marketing",
         "temperature": 0.8,
+        "model": "gpt-4o-mini",
         "specialties": ["Sales Funnels", "Conversion Optimization", "Objection Handling", "Closing Techniques"],
         "quick_actions": ["Sales Script", "Objection Handling", "Pipeline Review", "Closing Tips"],
         "is_custom": False
@@ -291,6 +415,7 @@ BOT_PERSONALITIES = {
         "emoji": "📱",
         "category": "Sales & Marketing",
         "temperature": 0.8,
+        "model": "gpt-4o-mini",
         "specialties": ["Digital Marketing", "Brand Positioning", "Customer Acquisition", "Campaign Strategy"],
         "quick_actions": ["Marketing Plan", "Brand Strategy", "Campaign Ideas", "Target Audience"],
         "is_custom": False
@@ -300,6 +425,7 @@ BOT_PERSONALITIES = {
         "emoji": "✍️",
         "category": "Sales & Marketing",
         "temperature": 0.8,
+        "model": "gpt-4o-mini",
         "specialties": ["Content Strategy", "Editorial Calendars", "Storytelling", "Brand Authority"],
         "quick_actions": ["Content Calendar", "Blog Ideas", "Social Posts", "Video Scripts"],
         "is_custom": False
@@ -311,6 +437,7 @@ BOT_PERSONALITIES = {
         "emoji": "💰",
         "category": "Finance & Accounting",
         "temperature": 0.5,
+        "model": "gpt-4o",
         "specialties": ["Financial Planning", "Budget Management", "Cash Flow", "Cost Control"],
         "quick_actions": ["Budget Planning", "Cash Flow Analysis", "Cost Reduction", "Financial Reports"],
         "is_custom": False
@@ -320,6 +447,7 @@ BOT_PERSONALITIES = {
         "emoji": "🏦",
         "category": "Finance & Accounting",
         "temperature": 0.5,
+        "model": "gpt-4o",
         "specialties": ["Corporate Finance", "M&A", "Capital Raising", "Valuations"],
         "quick_actions": ["Deal Analysis", "Valuation Model", "M&A Strategy", "Capital Structure"],
         "is_custom": False
@@ -331,6 +459,7 @@ BOT_PERSONALITIES = {
         "emoji": "🔄",
         "category": "Technology & Innovation",
         "temperature": 0.7,
+        "model": "gpt-4o-mini",
         "specialties": ["Digital Strategy", "Technology Adoption", "Change Management", "Innovation"],
         "quick_actions": ["Digital Roadmap", "Tech Assessment", "Change Plan", "Innovation Strategy"],
         "is_custom": False
@@ -340,6 +469,7 @@ BOT_PERSONALITIES = {
         "emoji": "🤖",
         "category": "Technology & Innovation",
         "temperature": 0.7,
+        "model": "gpt-4o-mini",
         "specialties": ["AI Implementation", "Machine Learning", "Automation", "AI Strategy"],
         "quick_actions": ["AI Roadmap", "Use Case Analysis", "Automation Plan", "ML Strategy"],
         "is_custom": False
@@ -351,6 +481,7 @@ BOT_PERSONALITIES = {
         "emoji": "⚙️",
         "category": "Operations & Management",
         "temperature": 0.6,
+        "model": "gpt-4o-mini",
         "specialties": ["Process Improvement", "Supply Chain", "Lean Methodologies", "Efficiency"],
         "quick_actions": ["Process Map", "Efficiency Audit", "Workflow Design", "Cost Optimization"],
         "is_custom": False
@@ -360,6 +491,7 @@ BOT_PERSONALITIES = {
         "emoji": "📋",
         "category": "Operations & Management",
         "temperature": 0.6,
+        "model": "gpt-4o-mini",
         "specialties": ["Project Planning", "Resource Management", "Risk Management", "Stakeholder Communication"],
         "quick_actions": ["Project Plan", "Risk Assessment", "Team Structure", "Timeline Creation"],
         "is_custom": False
@@ -371,6 +503,7 @@ BOT_PERSONALITIES = {
         "emoji": "👥",
         "category": "Human Resources",
         "temperature": 0.7,
+        "model": "gpt-4o-mini",
         "specialties": ["Talent Management", "Culture Building", "Performance Management", "Employee Engagement"],
         "quick_actions": ["Hiring Strategy", "Performance Review", "Culture Assessment", "Team Building"],
         "is_custom": False
@@ -380,79 +513,150 @@ BOT_PERSONALITIES = {
         "emoji": "🎯",
         "category": "Human Resources",
         "temperature": 0.7,
+        "model": "gpt-4o-mini",
         "specialties": ["Recruitment Strategy", "Candidate Assessment", "Employer Branding", "Interview Process"],
         "quick_actions": ["Job Description", "Interview Questions", "Candidate Screening", "Offer Strategy"],
         "is_custom": False
     }
 }
 
+@dataclass(frozen=True, slots=True)
+class BotInfo(Mapping[str, Any]):
+    """Immutable predefined bot; also readable as a mapping so it can stand in for custom bot dicts"""
+    description: str
+    emoji: str
+    category: str
+    temperature: float
+    model: str
+    specialties: Tuple[str, ...]
+    quick_actions: Tuple[str, ...]
+    is_custom: bool = False
+    
+    def __getitem__(self, key: str) -> Any:
+        if key not in self.__slots__:
+            raise KeyError(key)
+        return getattr(self, key)
+    
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.__slots__)
+    
+    def __len__(self) -> int:
+        return len(self.__slots__)
+
+# Predefined bots are shared by every session, so freeze them into read-only records;
+# category/emoji/specialty strings are interned since they're compared and used as keys
+BOT_PERSONALITIES: Mapping[str, BotInfo] = MappingProxyType({
+    sys.intern(name): BotInfo(**{
+        **info,
+        'category': sys.intern(info['category']),
+        'emoji': sys.intern(info['emoji']),
+        'specialties': tuple(sys.intern(s) for s in info['specialties']),
+        'quick_actions': tuple(info['quick_actions'])
+    })
+    for name, info in BOT_PERSONALITIES.items()
+})
+
 # ======================================================
 # 🗄️ ENHANCED DATA MANAGEMENT WITH SUPABASE INTEGRATION
 # ======================================================
 
-# Import enhanced Supabase integration
-try:
-    from supabase_integration import enhanced_auth
-except ImportError:
-    # Fallback to basic auth if enhanced integration is not available
-    from auth import auth as enhanced_auth
+@st.cache_resource
+def get_auth():
+    """Return the auth backend, preferring the enhanced Supabase integration"""
+    try:
+        from supabase_integration import enhanced_auth
+        return enhanced_auth
+    except ImportError:
+        # Fallback to basic auth if enhanced integration is not available
+        from auth import auth
+        return auth
+
+enhanced_auth = get_auth()
+
+# Optional storage methods the auth backend provides, probed once rather than
+# discovered by catching AttributeError on every call
+_AUTH_METHODS = frozenset(
+    name for name in (
+        'load_custom_bots', 'save_custom_bot', 'delete_custom_bot',
+        'load_chat_history', 'save_chat_message', 'save_chat_messages', 'clear_chat_history'
+    )
+    if callable(getattr(enhanced_auth, name, None))
+)
+
+# SQLite file backing custom bots when the auth backend has no bot storage
+CUSTOM_BOTS_DB_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "bots.db")
+
+@st.cache_resource
+def _bot_store() -> Tuple[sqlite3.Connection, threading.Lock]:
+    """Open the custom bot store shared by every session; the lock serialises use of the shared connection"""
+    conn = sqlite3.connect(CUSTOM_BOTS_DB_PATH, check_same_thread=False)
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS bots (user_id TEXT, name TEXT, data TEXT, PRIMARY KEY (user_id, name))"
+    )
+    conn.commit()
+    return conn, threading.Lock()
+
+def _load_stored_bots(user_id: str) -> Dict[str, Dict]:
+    """Read a user's custom bots from the SQLite store"""
+    conn, lock = _bot_store()
+    with lock:
+        rows = conn.execute("SELECT name, data FROM bots WHERE user_id = ?", (user_id,)).fetchall()
+    return {name: json.loads(data) for name, data in rows}
 
 def load_custom_bots(user_id: str) -> Dict[str, Dict]:
     """Load custom bots for a specific user"""
-    try:
+    if 'load_custom_bots' in _AUTH_METHODS:
         return enhanced_auth.load_custom_bots(user_id)
-    except AttributeError:
-        # Fallback to session state if enhanced auth doesn't have this method
-        if 'custom_bots' not in st.session_state:
-            st.session_state.custom_bots = {}
-        return st.session_state.custom_bots.get(user_id, {})
-
-def save_custom_bot(user_id: str, bot_name: str, bot_data: Dict) -> bool:
-    """Save a custom bot for a specific user"""
+    
+    # Fallback to the SQLite store if enhanced auth doesn't have this method
     try:
+        return _load_stored_bots(user_id)
+    except Exception as e:
+        logger.error(f"Error loading custom bots: {str(e)}")
+        return {}
+
+def save_custom_bot(user_id: str, bot_name: str, bot_data: Dict, now_iso: Optional[str] = None) -> bool:
+    """Save a custom bot for a specific user; bulk callers can pass one shared timestamp"""
+    if 'save_custom_bot' in _AUTH_METHODS:
         return enhanced_auth.save_custom_bot(user_id, bot_name, bot_data)
-    except AttributeError:
-        # Fallback to session state
-        try:
-            if 'custom_bots' not in st.session_state:
-                st.session_state.custom_bots = {}
-            
-            if user_id not in st.session_state.custom_bots:
-                st.session_state.custom_bots[user_id] = {}
-            
-            bot_data['is_custom'] = True
-            bot_data['created_at'] = datetime.now().isoformat()
-            bot_data['updated_at'] = datetime.now().isoformat()
-            
-            st.session_state.custom_bots[user_id][bot_name] = bot_data
-            return True
-        except Exception as e:
-            logger.error(f"Error saving custom bot: {str(e)}")
-            return False
+    
+    # Fallback to the SQLite store
+    try:
+        now_iso = now_iso or datetime.now().isoformat()
+        bot_data['is_custom'] = True
+        bot_data['created_at'] = bot_data['updated_at'] = now_iso
+        
+        conn, lock = _bot_store()
+        with lock, conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO bots (user_id, name, data) VALUES (?, ?, ?)",
+                (user_id, bot_name, json.dumps(bot_data))
+            )
+        return True
+    except Exception as e:
+        logger.error(f"Error saving custom bot: {str(e)}")
+        return False
 
 def delete_custom_bot(user_id: str, bot_name: str) -> bool:
     """Delete a custom bot for a specific user"""
-    try:
+    if 'delete_custom_bot' in _AUTH_METHODS:
         return enhanced_auth.delete_custom_bot(user_id, bot_name)
-    except AttributeError:
-        # Fallback to session state
-        try:
-            if ('custom_bots' in st.session_state and 
-                user_id in st.session_state.custom_bots and 
-                bot_name in st.session_state.custom_bots[user_id]):
-                del st.session_state.custom_bots[user_id][bot_name]
-                return True
-            return False
-        except Exception as e:
-            logger.error(f"Error deleting custom bot: {str(e)}")
-            return False
+    
+    # Fallback to the SQLite store
+    try:
+        conn, lock = _bot_store()
+        with lock, conn:
+            deleted = conn.execute(
+                "DELETE FROM bots WHERE user_id = ? AND name = ?", (user_id, bot_name)
+            ).rowcount
+        return deleted > 0
+    except Exception as e:
+        logger.error(f"Error deleting custom bot: {str(e)}")
+        return False
 
-def get_all_bots(user_id: str) -> Dict[str, Dict]:
-    """Get all bots (predefined + custom) for a user"""
-    all_bots = BOT_PERSONALITIES.copy()
-    custom_bots = load_custom_bots(user_id)
-    all_bots.update(custom_bots)
-    return all_bots
+def get_all_bots(user_id: str) -> Mapping[str, Dict]:
+    """Get a read-only view of all bots (custom bots shadow predefined ones) for a user"""
+    return ChainMap(load_custom_bots(user_id), BOT_PERSONALITIES)
 
 def load_user_preferences(user_id: str) -> Dict[str, Any]:
     """Load user preferences"""
@@ -462,7 +666,7 @@ def load_user_preferences(user_id: str) -> Dict[str, Any]:
     if user_id not in st.session_state.user_preferences:
         # Default preferences
         st.session_state.user_preferences[user_id] = {
-            'default_model': 'gpt-4',
+            'default_model': None,
             'default_temperature': 0.7,
             'chat_history_limit': 50,
             'auto_save_chats': True,
@@ -485,37 +689,123 @@ def save_user_preferences(user_id: str, preferences: Dict[str, Any]) -> bool:
 
 def load_persistent_chat_history(user_id: str) -> List[Dict]:
     """Load persistent chat history"""
-    try:
+    if 'load_chat_history' in _AUTH_METHODS:
         return enhanced_auth.load_chat_history(user_id)
-    except AttributeError:
-        # Fallback - return empty list, session state manages this
-        return []
+    # Fallback - return empty list, session state manages this
+    return []
 
 def save_chat_message(user_id: str, agent_name: str, user_message: str, agent_response: str) -> bool:
     """Save a chat message persistently"""
-    try:
+    if 'save_chat_message' in _AUTH_METHODS:
         return enhanced_auth.save_chat_message(user_id, agent_name, user_message, agent_response)
-    except AttributeError:
-        # Fallback - return True, session state manages this
+    # Fallback - return True, session state manages this
+    return True
+
+# Buffered chat messages are written in one batch once this many are pending
+PENDING_SAVES_FLUSH_SIZE = 10
+# ...or once the oldest has waited this many seconds, checked at the end of every run
+PENDING_SAVES_MAX_AGE = 5
+# While the backend keeps failing, retries back off up to this many seconds and the
+# buffer keeps only the newest messages
+PENDING_SAVES_MAX_BACKOFF = 60
+PENDING_SAVES_MAX = 200
+
+def queue_chat_message(user_id: str, agent_name: str, user_message: str, agent_response: str):
+    """Buffer a chat message for the next batched save instead of writing it immediately"""
+    pending = st.session_state.setdefault('pending_saves', [])
+    pending.append({
+        'user_id': user_id,
+        'agent_name': agent_name,
+        'user_message': user_message,
+        'agent_response': agent_response,
+        'timestamp': datetime.now().isoformat(),
+        'queued_at': time.time()
+    })
+    if len(pending) > PENDING_SAVES_MAX:
+        dropped = len(pending) - PENDING_SAVES_MAX
+        del pending[:dropped]
+        logger.error(f"Chat save buffer full; dropped {dropped} unsaved messages")
+    if len(pending) >= PENDING_SAVES_FLUSH_SIZE:
+        flush_pending_saves()
+
+def flush_stale_saves():
+    """Flush buffered chat messages once the oldest has waited PENDING_SAVES_MAX_AGE seconds"""
+    pending = st.session_state.get('pending_saves')
+    if pending and time.time() - pending[0]['queued_at'] >= PENDING_SAVES_MAX_AGE:
+        flush_pending_saves()
+
+def flush_pending_saves(force: bool = False) -> bool:
+    """Persist all buffered chat messages in one round trip, backing off after failures unless forced"""
+    pending = st.session_state.get('pending_saves')
+    if not pending:
         return True
+    if not force and time.time() < st.session_state.get('save_retry_at', 0):
+        return False
+    
+    # Messages leave the buffer only once they're saved, so a failed flush is retried next time
+    batch = [{key: value for key, value in msg.items() if key != 'queued_at'} for msg in pending]
+    try:
+        if 'save_chat_messages' in _AUTH_METHODS:
+            saved = batch if enhanced_auth.save_chat_messages(batch) else []
+        else:
+            # Fallback to one save per message if the backend has no batch API
+            saved = [
+                msg for msg in batch
+                if save_chat_message(msg['user_id'], msg['agent_name'], msg['user_message'], msg['agent_response'])
+            ]
+    except Exception as e:
+        logger.error(f"Error saving chat messages: {str(e)}")
+        saved = []
+    
+    saved_ids = {id(msg) for msg in saved}
+    pending[:] = [original for original, msg in zip(pending, batch) if id(msg) not in saved_ids]
+    if pending:
+        backoff = min(max(2 * st.session_state.get('save_backoff', 0), 1), PENDING_SAVES_MAX_BACKOFF)
+        st.session_state.save_backoff = backoff
+        st.session_state.save_retry_at = time.time() + backoff
+        logger.error(f"Failed to save {len(pending)} chat messages; retrying in {backoff}s")
+        return False
+    
+    st.session_state.save_backoff = 0
+    st.session_state.save_retry_at = 0
+    return True
 
 # ======================================================
 # 🧠 ENHANCED AGENT PROMPT GENERATION
 # ======================================================
 
-def get_agent_prompt(agent_name: str, user_id: str = None) -> str:
-    """Generate system prompt for an agent (predefined or custom)"""
-    all_bots = get_all_bots(user_id) if user_id else BOT_PERSONALITIES
-    agent = all_bots.get(agent_name)
-    
-    if not agent:
-        return "You are a helpful AI assistant."
+DEFAULT_AGENT_PROMPT = "You are a helpful AI assistant."
+
+def get_agent_prompt(agent_name: str, user_id: str = None, *, custom_bots: Optional[Mapping[str, Dict]] = None) -> str:
+    """Generate system prompt for an agent (predefined or custom); callers holding the custom bots can pass them"""
+    if custom_bots is None and user_id:
+        custom_bots = load_custom_bots(user_id)
+    if custom_bots:
+        custom_bot = custom_bots.get(agent_name)
+        if custom_bot:
+            version = custom_bot.get('updated_at')
+            if version is None:
+                return _build_custom_prompt(agent_name, custom_bot)
+            return _cached_custom_prompt(user_id, agent_name, version, custom_bot)
     
+    return _PROMPT_CACHE.get(agent_name, DEFAULT_AGENT_PROMPT)
+
+@st.cache_data(max_entries=256)
+def _cached_custom_prompt(user_id: str, agent_name: str, version: str, _agent: Dict) -> str:
+    """Custom bot prompt keyed on its last update, so edits produce a fresh prompt"""
+    # The leading underscore keeps Streamlit from hashing the bot dict itself
+    return _build_custom_prompt(agent_name, _agent)
+
+def _build_custom_prompt(agent_name: str, agent: Dict) -> str:
+    """Generate system prompt for a custom bot"""
     # For custom bots, use their system_prompt if available
     if agent.get('is_custom', False) and 'system_prompt' in agent:
         return agent['system_prompt']
     
-    # For predefined bots, generate prompt from description and specialties
+    return _build_prompt(agent_name, agent)
+
+def _build_prompt(agent_name: str, agent: Dict) -> str:
+    """Generate prompt from an agent's description and specialties"""
     prompt = f"""You are {agent_name}, {agent['description']}
 
 Your specialties include: {', '.join(agent.get('specialties', []))}
@@ -526,57 +816,550 @@ Keep your responses concise but comprehensive, and always aim to provide practic
 """
     return prompt
 
+# Predefined bots never change at runtime, so their prompts and category
+# grouping are computed once at import instead of on every rerun
+_PROMPT_CACHE: Dict[str, str] = {name: _build_prompt(name, info) for name, info in BOT_PERSONALITIES.items()}
+
+# Column views of the predefined bots; grouping only needs names and categories
+_BOT_NAMES: Tuple[str, ...] = tuple(BOT_PERSONALITIES)
+_BOT_CATEGORIES: Tuple[str, ...] = tuple(info.category for info in BOT_PERSONALITIES.values())
+
+_category_groups: Dict[str, List[str]] = defaultdict(list)
+for _name, _category in zip(_BOT_NAMES, _BOT_CATEGORIES):
+    _category_groups[_category].append(_name)
+
+_CATEGORY_INDEX: Mapping[str, Tuple[str, ...]] = MappingProxyType(
+    {category: tuple(names) for category, names in _category_groups.items()}
+)
+
+CATEGORIES = tuple(_CATEGORY_INDEX)
+
+def bots_in_category(category: str) -> Tuple[str, ...]:
+    """Return the predefined bot names in a category"""
+    return _CATEGORY_INDEX.get(category, ())
+
 # ======================================================
-# 💬 ENHANCED CHAT FUNCTIONALITY
+# 🗃️ RESPONSE CACHE
 # ======================================================
 
-def chat_with_agent(user_message: str, agent_name: str, user_id: str = None) -> str:
-    """Chat with an AI agent using OpenAI API with enhanced personalization"""
-    client, api_key = initialize_openai()
+RESPONSE_CACHE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "response_cache.db")
+EMBEDDING_MODEL = "text-embedding-3-small"
+SEMANTIC_CACHE_THRESHOLD = 0.95
+
+# Sampled replies are only reused for a while so a re-asked question eventually gets a fresh answer
+RESPONSE_CACHE_TTL = 24 * 60 * 60
+# Bounds on what the cache keeps in memory and on disk
+RESPONSE_CACHE_MAX_ENTRIES = 5000
+SEMANTIC_INDEX_MAX_ENTRIES = 256
+SEMANTIC_MAX_SCOPES = 1000
+# Expired and surplus rows are pruned from SQLite every this many writes
+RESPONSE_CACHE_PRUNE_EVERY = 100
+
+class EmbeddingIndex:
+    """Growable matrix of L2-normalised embeddings with aligned responses, oldest first"""
     
-    if not client:
-        return "⚠️ OpenAI API key not configured. Please add your API key to continue."
+    def __init__(self, vectors: np.ndarray, responses: List[str], created: List[float]):
+        self.vectors = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+        self.size = len(responses)
+        self.responses = responses
+        self.created = np.asarray(created, dtype=np.float64)
     
-    try:
-        all_bots = get_all_bots(user_id) if user_id else BOT_PERSONALITIES
-        agent = all_bots.get(agent_name, all_bots.get("Startup Strategist"))
-        
-        # Get user preferences for model and temperature
-        user_prefs = load_user_preferences(user_id) if user_id else {}
-        model = user_prefs.get('default_model', 'gpt-4')
-        temperature = agent.get('temperature', user_prefs.get('default_temperature', 0.7))
+    def add(self, embedding: np.ndarray, response: str, created: float):
+        """Append one embedding, doubling the buffer when it is full and dropping the oldest half at the cap"""
+        if self.size >= SEMANTIC_INDEX_MAX_ENTRIES:
+            keep = self.size // 2
+            self.vectors[:keep] = self.vectors[self.size - keep:self.size]
+            self.created[:keep] = self.created[self.size - keep:self.size]
+            self.responses = self.responses[self.size - keep:]
+            self.size = keep
+        if self.size == len(self.vectors):
+            capacity = min(max(2 * self.size, 1), SEMANTIC_INDEX_MAX_ENTRIES)
+            grown = np.empty((capacity, self.vectors.shape[1]), dtype=np.float32)
+            grown[:self.size] = self.vectors[:self.size]
+            self.vectors = grown
+            grown_created = np.empty(capacity, dtype=np.float64)
+            grown_created[:self.size] = self.created[:self.size]
+            self.created = grown_created
+        self.vectors[self.size] = embedding / np.linalg.norm(embedding)
+        self.created[self.size] = created
+        self.size += 1
+        self.responses.append(response)
+    
+    def best_match(self, embedding: np.ndarray, not_before: float) -> Tuple[float, Optional[str]]:
+        """Return the highest cosine similarity and its response among entries newer than not_before"""
+        # Entries are in insertion order, so the unexpired ones are a suffix
+        start = int(np.searchsorted(self.created[:self.size], not_before))
+        if start >= self.size:
+            return -1.0, None
+        similarities = self.vectors[start:self.size] @ (embedding / np.linalg.norm(embedding))
+        best = int(similarities.argmax())
+        return float(similarities[best]), self.responses[start + best]
+
+class ResponseCache:
+    """Exact + semantic cache of agent responses backed by SQLite, bounded in size and age"""
+    
+    def __init__(self, db_path: str):
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses("
+            "key TEXT PRIMARY KEY, agent TEXT, embedding BLOB, response TEXT, created_at TEXT)"
+        )
+        self._prune()
+        self.writes = 0
         
-        messages = [
-            {"role": "system", "content": get_agent_prompt(agent_name, user_id)},
-            {"role": "user", "content": user_message}
-        ]
+        # Exact tier: request hash -> (response, created timestamp), least recently used first
+        self.responses: OrderedDict[str, Tuple[str, float]] = OrderedDict()
+        # Semantic tier: embedding index per scope (user, agent and system prompt), least
+        # recently used first; the table's agent column holds the scope
+        self.indexes: OrderedDict[str, EmbeddingIndex] = OrderedDict()
         
-        # Add recent chat history for context
-        if st.session_state.chat_history:
-            recent_history = st.session_state.chat_history[-6:]  # Last 3 exchanges
-            for msg in recent_history:
-                if msg['agent'] == agent_name:
-                    messages.insert(-1, {"role": "assistant", "content": msg['response']})
-                    messages.insert(-1, {"role": "user", "content": msg['message']})
+        stored_embeddings: Dict[str, List[bytes]] = defaultdict(list)
+        stored_responses: Dict[str, List[str]] = defaultdict(list)
+        stored_created: Dict[str, List[float]] = defaultdict(list)
+        for key, scope, embedding, response, created_at in self.conn.execute(
+            "SELECT key, agent, embedding, response, created_at FROM responses ORDER BY created_at"
+        ):
+            created = datetime.fromisoformat(created_at).timestamp()
+            self.responses[key] = (response, created)
+            if embedding is not None:
+                stored_embeddings[scope].append(embedding)
+                stored_responses[scope].append(response)
+                stored_created[scope].append(created)
         
-        response = client.chat.completions.create(
-            model=model,
-            messages=messages,
-            temperature=temperature,
-            max_tokens=1000
+        # Decode each scope's newest stored rows into one matrix in a single pass
+        for scope, blobs in stored_embeddings.items():
+            blobs = blobs[-SEMANTIC_INDEX_MAX_ENTRIES:]
+            vectors = np.frombuffer(b"".join(blobs), dtype=np.float32).reshape(len(blobs), -1)
+            self.indexes[scope] = EmbeddingIndex(
+                vectors, stored_responses[scope][-len(blobs):], stored_created[scope][-len(blobs):]
+            )
+        while len(self.indexes) > SEMANTIC_MAX_SCOPES:
+            self.indexes.popitem(last=False)
+    
+    def _prune(self):
+        """Delete expired rows and keep only the newest RESPONSE_CACHE_MAX_ENTRIES in SQLite"""
+        cutoff = datetime.fromtimestamp(time.time() - RESPONSE_CACHE_TTL).isoformat()
+        self.conn.execute("DELETE FROM responses WHERE created_at < ?", (cutoff,))
+        self.conn.execute(
+            "DELETE FROM responses WHERE key NOT IN "
+            "(SELECT key FROM responses ORDER BY created_at DESC LIMIT ?)",
+            (RESPONSE_CACHE_MAX_ENTRIES,)
         )
+        self.conn.commit()
+    
+    @staticmethod
+    def make_key(request: Dict[str, Any]) -> str:
+        """Hash a chat request (model, messages, temperature) into a cache key"""
+        payload = json.dumps(request, sort_keys=True).encode()
+        return hashlib.blake2b(payload, digest_size=16).hexdigest()
+    
+    @staticmethod
+    def semantic_scope(request: Dict[str, Any], agent_name: str, user_id: Optional[str]) -> Optional[str]:
+        """Semantic tier partition for a request, or None if it carries history and must match exactly"""
+        messages = request['messages']
+        # A reply that depends on earlier turns can't be reused for a merely similar message
+        if len(messages) > 2:
+            return None
+        prompt_hash = hashlib.blake2b(messages[0]['content'].encode(), digest_size=8).hexdigest()
+        return f"{user_id or ''}\x1f{agent_name}\x1f{prompt_hash}"
+    
+    def get(self, key: str) -> Optional[str]:
+        """Return the cached response for an exact request match that hasn't expired"""
+        with self.lock:
+            entry = self.responses.get(key)
+            if entry is None:
+                return None
+            response, created = entry
+            if created < time.time() - RESPONSE_CACHE_TTL:
+                del self.responses[key]
+                return None
+            self.responses.move_to_end(key)
+            return response
+    
+    def get_similar(self, scope: str, embedding: np.ndarray) -> Optional[str]:
+        """Return the cached response for the nearest prior prompt in a scope if it is similar enough"""
+        with self.lock:
+            index = self.indexes.get(scope)
+            if index is None:
+                return None
+            
+            self.indexes.move_to_end(scope)
+            similarity, response = index.best_match(embedding, time.time() - RESPONSE_CACHE_TTL)
+            return response if similarity >= SEMANTIC_CACHE_THRESHOLD else None
+    
+    def put(self, key: str, scope: Optional[str], embedding: Optional[np.ndarray], response: str):
+        """Store a response in memory and write it through to SQLite"""
+        now = time.time()
+        with self.lock:
+            self.responses[key] = (response, now)
+            self.responses.move_to_end(key)
+            if len(self.responses) > RESPONSE_CACHE_MAX_ENTRIES:
+                self.responses.popitem(last=False)
+            
+            if embedding is not None:
+                if scope in self.indexes:
+                    self.indexes[scope].add(embedding, response, now)
+                    self.indexes.move_to_end(scope)
+                else:
+                    self.indexes[scope] = EmbeddingIndex(embedding.reshape(1, -1), [response], [now])
+                    if len(self.indexes) > SEMANTIC_MAX_SCOPES:
+                        self.indexes.popitem(last=False)
+            
+            self.conn.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?)",
+                (key, scope, embedding.tobytes() if embedding is not None else None,
+                 response, datetime.fromtimestamp(now).isoformat())
+            )
+            self.conn.commit()
+            
+            self.writes += 1
+            if self.writes % RESPONSE_CACHE_PRUNE_EVERY == 0:
+                self._prune()
+    
+    def clear(self):
+        """Drop every cached response from memory and SQLite"""
+        with self.lock:
+            self.responses.clear()
+            self.indexes.clear()
+            self.conn.execute("DELETE FROM responses")
+            self.conn.commit()
+
+@st.cache_resource
+def get_response_cache() -> ResponseCache:
+    """Process-wide response cache shared by all sessions"""
+    return ResponseCache(RESPONSE_CACHE_PATH)
+
+# ======================================================
+# 💬 ENHANCED CHAT FUNCTIONALITY
+# ======================================================
+
+# Session history is a ring buffer; evicted turns are folded into a running summary
+CHAT_HISTORY_MAXLEN = 200
+SUMMARY_WINDOW = 50
+SUMMARY_MODEL = "gpt-4o-mini"
+
+# Most recent history entries per agent considered as context for a new turn
+MAX_CONTEXT_MESSAGES = 6
+
+def index_history_by_agent(entries=()) -> Dict[str, deque]:
+    """Group history entries into per-agent windows of the most recent context turns"""
+    by_agent = defaultdict(functools.partial(deque, maxlen=MAX_CONTEXT_MESSAGES))
+    for entry in entries:
+        by_agent[entry['agent']].append(entry)
+    return by_agent
+
+# History entries always drawn on the chat page; older ones render only on request
+LIVE_HISTORY_TURNS = 2
+
+# Prompt budget (system + history + message) before older turns are dropped
+HISTORY_TOKEN_BUDGET = 6000
+# Per-message framing overhead used by the chat format
+TOKENS_PER_MESSAGE = 4
+
+@st.cache_resource
+def get_encoder(model: str = DEFAULT_MODEL) -> tiktoken.Encoding:
+    """Load the tokenizer for a model once per process"""
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        return tiktoken.get_encoding("cl100k_base")
+
+def count_tokens(messages: List[Dict[str, str]], model: str = DEFAULT_MODEL) -> int:
+    """Count prompt tokens for a list of chat messages"""
+    encoder = get_encoder(model)
+    return sum(len(encoder.encode(msg['content'])) + TOKENS_PER_MESSAGE for msg in messages)
+
+def _trim(token_counts: np.ndarray, budget: int) -> int:
+    """Return how many of the oldest history messages to drop so the rest fit in budget"""
+    # suffix_totals[i] is the token cost of keeping history messages i onwards
+    suffix_totals = np.cumsum(token_counts[::-1])[::-1]
+    over_budget = np.flatnonzero(suffix_totals > budget)
+    cut = int(over_budget[-1]) + 1 if over_budget.size else 0
+    # History is stored as user/assistant pairs, so never split one
+    return cut + (cut % 2)
+
+def build_chat_request(user_message: str, agent_name: str, user_id: str = None) -> Dict[str, Any]:
+    """Build the OpenAI request payload for one agent turn"""
+    # Load custom bots once and share them with the prompt lookup below
+    custom_bots = load_custom_bots(user_id) if user_id else {}
+    all_bots = ChainMap(custom_bots, BOT_PERSONALITIES)
+    agent = all_bots.get(agent_name, all_bots.get("Startup Strategist"))
+
+    # Get user preferences for model and temperature
+    user_prefs = load_user_preferences(user_id) if user_id else {}
+    model = user_prefs.get('default_model') or agent.get('model', DEFAULT_MODEL)
+    temperature = agent.get('temperature', user_prefs.get('default_temperature', 0.7))
+
+    # Add this agent's recent chat history for context, oldest turn first
+    recent_history = st.session_state.history_by_agent.get(agent_name, ())
+    history_messages = [
+        turn
+        for msg in recent_history
+        for turn in ({"role": "user", "content": msg['message']},
+                     {"role": "assistant", "content": msg['response']})
+    ]
+
+    messages = [
+        {"role": "system", "content": get_agent_prompt(agent_name, user_id, custom_bots=custom_bots)},
+        *history_messages,
+        {"role": "user", "content": user_message}
+    ]
+
+    # Drop the oldest history turns until the prompt fits the token budget
+    encoder = get_encoder(model)
+    token_counts = np.asarray(
+        [len(encoder.encode(msg['content'])) + TOKENS_PER_MESSAGE for msg in messages], dtype=np.int32
+    )
+    history_budget = HISTORY_TOKEN_BUDGET - int(token_counts[0] + token_counts[-1])
+    cut = _trim(token_counts[1:-1], history_budget)
+    if cut:
+        del messages[1:1 + cut]
+
+    return {
+        'model': model,
+        'messages': messages,
+        'temperature': temperature,
+        'max_tokens': 1000
+    }
+
+async def embed_for_cache(client: AsyncOpenAI, scope: Optional[str], user_message: str) -> Optional[np.ndarray]:
+    """Embed a message for the semantic cache tier, or None if the request has no scope"""
+    if scope is None:
+        return None
+    try:
+        embedding_response = await client.embeddings.create(model=EMBEDDING_MODEL, input=user_message)
+        return np.asarray(embedding_response.data[0].embedding, dtype=np.float32)
+    except Exception as e:
+        # The semantic tier is best-effort; fall through to a normal completion
+        logger.warning(f"Embedding lookup failed: {str(e)}")
+        return None
+
+async def chat_with_agent_async(client: AsyncOpenAI, request: Dict[str, Any], semaphore: asyncio.Semaphore,
+                                scope: Optional[str], user_message: str, cache: ResponseCache) -> str:
+    """Answer one prepared chat request from the cache, or from OpenAI on a miss"""
+    key = ResponseCache.make_key(request)
+    cached = cache.get(key)
+    if cached is not None:
+        return cached
+    
+    async with semaphore:
+        embedding = await embed_for_cache(client, scope, user_message)
+        if embedding is not None:
+            cached = cache.get_similar(scope, embedding)
+            if cached is not None:
+                return cached
         
-        agent_response = response.choices[0].message.content
-        
-        # Save to persistent storage if available
+        response = await client.chat.completions.create(**request)
+    
+    content = response.choices[0].message.content
+    cache.put(key, scope, embedding, content)
+    return content
+
+def chat_with_agents_batch(messages_per_agent: List[Tuple[str, str]], user_id: str = None) -> List[str]:
+    """Send (user_message, agent_name) pairs concurrently and return responses in order"""
+    client, api_key = initialize_openai()
+
+    if not client:
+        return ["⚠️ OpenAI API key not configured. Please add your API key to continue."] * len(messages_per_agent)
+
+    # Payloads are built here because session state is only readable from the script thread
+    requests_batch = [build_chat_request(message, agent_name, user_id) for message, agent_name in messages_per_agent]
+
+    semaphore = get_request_semaphore()
+    cache = get_response_cache()
+
+    async def gather_responses():
+        return await asyncio.gather(
+            *[chat_with_agent_async(client, request, semaphore,
+                                    ResponseCache.semantic_scope(request, agent_name, user_id), message, cache)
+              for request, (message, agent_name) in zip(requests_batch, messages_per_agent)],
+            return_exceptions=True
+        )
+
+    results = asyncio.run_coroutine_threadsafe(gather_responses(), get_event_loop()).result()
+
+    responses = []
+    for (message, agent_name), result in zip(messages_per_agent, results):
+        if isinstance(result, Exception):
+            logger.error(f"Error in chat: {str(result)}")
+            responses.append(f"❌ Error: {str(result)}")
+            continue
+
+        # Queue for persistent storage if available; written in batches
         if user_id:
-            save_chat_message(user_id, agent_name, user_message, agent_response)
-        
-        return agent_response
-        
+            queue_chat_message(user_id, agent_name, message, result)
+        responses.append(result)
+
+    return responses
+
+def chat_with_agent_stream(user_message: str, agent_name: str, user_id: str = None) -> Iterator[str]:
+    """Yield an agent's response incrementally as token deltas arrive"""
+    client, api_key = initialize_openai()
+
+    if not client:
+        yield "⚠️ OpenAI API key not configured. Please add your API key to continue."
+        return
+
+    request = build_chat_request(user_message, agent_name, user_id)
+    semaphore = get_request_semaphore()
+    cache = get_response_cache()
+
+    key = ResponseCache.make_key(request)
+    scope = ResponseCache.semantic_scope(request, agent_name, user_id)
+    cached = cache.get(key)
+    if cached is not None:
+        # Cache hits are still part of the conversation, same as in the batch path
+        if user_id:
+            queue_chat_message(user_id, agent_name, user_message, cached)
+        yield cached
+        return
+
+    # Deltas are produced on the background loop and consumed here on the script thread
+    deltas = queue.Queue()
+
+    async def produce_deltas():
+        try:
+            async with semaphore:
+                embedding = await embed_for_cache(client, scope, user_message)
+                if embedding is not None:
+                    similar = cache.get_similar(scope, embedding)
+                    if similar is not None:
+                        deltas.put(similar)
+                        return None, False
+                
+                stream = await client.chat.completions.create(**request, stream=True)
+                async for chunk in stream:
+                    if chunk.choices and chunk.choices[0].delta.content:
+                        deltas.put(chunk.choices[0].delta.content)
+                return embedding, True
+        finally:
+            deltas.put(None)
+
+    future = asyncio.run_coroutine_threadsafe(produce_deltas(), get_event_loop())
+
+    parts = []
+    while (delta := deltas.get()) is not None:
+        parts.append(delta)
+        yield delta
+
+    try:
+        embedding, is_fresh = future.result()
     except Exception as e:
         logger.error(f"Error in chat: {str(e)}")
-        return f"❌ Error: {str(e)}"
+        yield f"❌ Error: {str(e)}"
+        return
+
+    content = "".join(parts)
+    if is_fresh:
+        cache.put(key, scope, embedding, content)
+
+    # Queue for persistent storage if available; written in batches
+    if user_id:
+        queue_chat_message(user_id, agent_name, user_message, content)
+
+def chat_with_agent(user_message: str, agent_name: str, user_id: str = None) -> str:
+    """Chat with an AI agent using OpenAI API with enhanced personalization"""
+    return chat_with_agents_batch([(user_message, agent_name)], user_id)[0]
+
+def get_recent_history(limit: int) -> List[Dict]:
+    """Return the last `limit` chat history entries, oldest first"""
+    history = st.session_state.chat_history
+    return list(islice(history, max(len(history) - limit, 0), None))
+
+def summarize_history(entries: List[Dict], previous_summary: str = "",
+                      pending: Optional[concurrent.futures.Future] = None) -> Optional[concurrent.futures.Future]:
+    """Start condensing evicted chat turns into the running summary on the background loop"""
+    client, api_key = initialize_openai()
+    if not client:
+        return pending
+    
+    transcript = "\n".join(
+        f"User: {entry['message']}\n{entry['agent']}: {entry['response'][:500]}" for entry in entries
+    )
+    
+    async def summarize() -> str:
+        # Chain onto a summary still in flight so no evicted window is lost
+        earlier = await asyncio.wrap_future(pending) if pending is not None else previous_summary
+        request = {
+            'model': SUMMARY_MODEL,
+            'messages': [
+                {"role": "system", "content": "Summarize this business advice conversation in a few bullet points, keeping key decisions and recommendations."},
+                {"role": "user", "content": f"Earlier summary:\n{earlier}\n\nNew conversation:\n{transcript}"}
+            ],
+            'temperature': 0.3,
+            'max_tokens': 300
+        }
+        
+        try:
+            response = await client.chat.completions.create(**request)
+            return response.choices[0].message.content
+        except Exception as e:
+            logger.error(f"Error summarizing chat history: {str(e)}")
+            return earlier
+    
+    return asyncio.run_coroutine_threadsafe(summarize(), get_event_loop())
+
+def current_history_summary() -> str:
+    """Running summary of evicted turns, picking up a background summary once it finishes"""
+    future = st.session_state.get('summary_future')
+    if future is not None and future.done():
+        st.session_state.history_summary = future.result()
+        st.session_state.summary_future = None
+    return st.session_state.history_summary
+
+def clear_chat_history():
+    """Empty the session chat history and release the memory it held"""
+    st.session_state.chat_history.clear()
+    st.session_state.history_by_agent = index_history_by_agent()
+    st.session_state.history_summary = ""
+    st.session_state.summary_future = None
+    st.session_state.agents_used = set()
+    st.session_state.total_messages = 0
+    gc.collect()
+
+def message_datetime(msg: Dict) -> Optional[datetime]:
+    """Time of a history entry, from the float `ts` or a persisted ISO `timestamp`"""
+    try:
+        if 'ts' in msg:
+            return datetime.fromtimestamp(msg['ts'])
+        return datetime.fromisoformat(msg['timestamp'])
+    except (KeyError, TypeError, ValueError):
+        return None
+
+def format_message_time(msg: Dict) -> str:
+    """Display string for a history entry's time"""
+    moment = message_datetime(msg)
+    return moment.isoformat(' ', 'seconds') if moment else msg.get('timestamp', '')
+
+def append_chat_turns(user_message: str, agent_names: List[str], responses: List[str]):
+    """Record one user message and each agent's response in the chat history"""
+    history = st.session_state.chat_history
+    
+    # Summarize a window of the oldest turns once instead of silently evicting them one by one
+    overflow = len(history) + len(agent_names) - CHAT_HISTORY_MAXLEN
+    if overflow > 0:
+        evicted = [history.popleft() for _ in range(min(max(overflow, SUMMARY_WINDOW), len(history)))]
+        # Summarized off the script thread; the page shows it once it's ready
+        st.session_state.summary_future = summarize_history(
+            evicted, current_history_summary(), st.session_state.get('summary_future')
+        )
+    
+    # Stored as a float and only formatted when a turn is actually displayed
+    ts = time.time()
+    for agent_name, response in zip(agent_names, responses):
+        entry = {
+            'message': user_message,
+            'response': response,
+            'agent': agent_name,
+            'ts': ts
+        }
+        st.session_state.chat_history.append(entry)
+        st.session_state.history_by_agent[agent_name].append(entry)
+    
+    # Keep sidebar stats incremental rather than rescanning the history each rerun
+    st.session_state.agents_used.update(agent_names)
+    st.session_state.total_messages += len(agent_names)
 
 # ======================================================
 # 🔐 AUTHENTICATION FUNCTIONS
@@ -591,15 +1374,23 @@ def init_session_state():
     if 'user_id' not in st.session_state:
         st.session_state.user_id = None
     if 'chat_history' not in st.session_state:
-        st.session_state.chat_history = []
+        st.session_state.chat_history = deque(maxlen=CHAT_HISTORY_MAXLEN)
+    if 'history_by_agent' not in st.session_state:
+        st.session_state.history_by_agent = index_history_by_agent(st.session_state.chat_history)
+    if 'history_summary' not in st.session_state:
+        st.session_state.history_summary = ""
+    if 'summary_future' not in st.session_state:
+        st.session_state.summary_future = None
+    if 'agents_used' not in st.session_state:
+        st.session_state.agents_used = set()
+    if 'total_messages' not in st.session_state:
+        st.session_state.total_messages = 0
     if 'selected_agent' not in st.session_state:
         st.session_state.selected_agent = "Startup Strategist"
     if 'auth_mode' not in st.session_state:
         st.session_state.auth_mode = "login"
     if 'current_page' not in st.session_state:
         st.session_state.current_page = "Chat"
-    if 'custom_bots' not in st.session_state:
-        st.session_state.custom_bots = {}
     if 'user_preferences' not in st.session_state:
         st.session_state.user_preferences = {}
 
@@ -618,12 +1409,9 @@ def login_form():
         """, unsafe_allow_html=True)
     
     # Display banner image if available
-    try:
-        if os.path.exists("ai_agent_toolkit_banner.png"):
-            banner = Image.open("ai_agent_toolkit_banner.png")
-            st.image(banner, use_column_width=True)
-    except:
-        pass
+    banner = _banner()
+    if banner:
+        st.image(banner, use_column_width=True)
     
     # Authentication mode selector
     col1, col2, col3 = st.columns([1, 2, 1])
@@ -671,7 +1459,10 @@ def login_section():
                     # Load persistent chat history if available
                     persistent_history = load_persistent_chat_history(st.session_state.user_id)
                     if persistent_history:
-                        st.session_state.chat_history = persistent_history
+                        st.session_state.chat_history = deque(persistent_history, maxlen=CHAT_HISTORY_MAXLEN)
+                        st.session_state.history_by_agent = index_history_by_agent(st.session_state.chat_history)
+                        st.session_state.agents_used = {msg['agent'] for msg in persistent_history}
+                        st.session_state.total_messages = len(persistent_history)
                     
                     st.success(result['message'])
                     st.rerun()
@@ -729,18 +1520,41 @@ def reset_password_section():
 # 🎨 ENHANCED UI COMPONENTS
 # ======================================================
 
+def _lazy_pil():
+    """Import PIL only when an image is actually drawn"""
+    from PIL import Image
+    return Image
+
+@st.cache_resource
+def _load_image(path: str):
+    """Decode an image once per process, or return None if it is missing or unreadable"""
+    try:
+        if os.path.exists(path):
+            image = _lazy_pil().open(path)
+            image.load()
+            return image
+    except Exception as e:
+        logger.error(f"Error loading image {path}: {str(e)}")
+    return None
+
+def _logo():
+    """Cached logo image, if available"""
+    return _load_image("ai_agent_toolkit_logo.png")
+
+def _banner():
+    """Cached banner image, if available"""
+    return _load_image("ai_agent_toolkit_banner.png")
+
 def display_logo():
     """Display the AI Agent Toolkit logo"""
-    try:
-        # Try to load the logo image
-        if os.path.exists("ai_agent_toolkit_logo.png"):
-            logo = Image.open("ai_agent_toolkit_logo.png")
-            st.image(logo, width=150)
-        else:
-            st.markdown("🤖")
-    except:
+    logo = _logo()
+    if logo:
+        st.image(logo, width=150)
+    else:
         st.markdown("🤖")
 
+PAGES = ("Chat", "Manage Custom Bots", "User Profile", "Analytics")
+
 def display_page_navigation():
     """Display page navigation in sidebar"""
     st.markdown("""
@@ -749,17 +1563,38 @@ def display_page_navigation():
     </div>
     """, unsafe_allow_html=True)
     
-    pages = ["Chat", "Manage Custom Bots", "User Profile", "Analytics"]
     selected_page = st.selectbox(
         "Select Page:",
-        pages,
-        index=pages.index(st.session_state.current_page) if st.session_state.current_page in pages else 0
+        PAGES,
+        index=PAGES.index(st.session_state.current_page) if st.session_state.current_page in PAGES else 0
     )
     
     if selected_page != st.session_state.current_page:
+        flush_pending_saves()
         st.session_state.current_page = selected_page
         st.rerun()
 
+_AGENT_CARD_TMPL = string.Template("""
+    <div class="$card_class">
+        <h4>$emoji $name</h4>
+        <p>$description</p>
+        <p><strong>Specialties:</strong> $specialties</p>
+        $custom_badge
+    </div>
+    """)
+
+@st.cache_data(max_entries=256)
+def render_agent_card(name: str, emoji: str, description: str, specialties: Tuple[str, ...], is_custom: bool) -> str:
+    """Render the agent info card HTML, keyed on the bot metadata it shows"""
+    return _AGENT_CARD_TMPL.substitute(
+        card_class="custom-bot-card" if is_custom else "agent-card",
+        emoji=emoji,
+        name=name,
+        description=description,
+        specialties=', '.join(specialties),
+        custom_badge="<p><strong>Custom Bot</strong> ✨</p>" if is_custom else ""
+    )
+
 def display_agent_selector():
     """Display agent selection interface"""
     st.markdown("""
@@ -771,23 +1606,30 @@ def display_agent_selector():
     # Get all bots for current user
     all_bots = get_all_bots(st.session_state.user_id)
     
-    # Group agents by category
-    categories = {}
-    for agent_name, agent_info in all_bots.items():
-        category = agent_info.get('category', 'Other')
-        if category not in categories:
-            categories[category] = []
-        categories[category].append(agent_name)
+    # Group agents by category, merging custom bots into the precomputed index
+    custom_bots = load_custom_bots(st.session_state.user_id)
+    if custom_bots:
+        # Only custom bots that reuse a predefined name need filtering out of the index
+        shadowed = custom_bots.keys() & BOT_PERSONALITIES.keys()
+        categories = {category: [name for name in names if name not in shadowed] if shadowed else list(names)
+                      for category, names in _CATEGORY_INDEX.items()}
+        for agent_name, agent_info in custom_bots.items():
+            categories.setdefault(agent_info.get('category', 'Other'), []).append(agent_name)
+        categories = {category: names for category, names in categories.items() if names}
+        category_options = tuple(categories)
+    else:
+        categories = None
+        category_options = CATEGORIES
     
     # Category selector
     selected_category = st.selectbox(
         "Choose Category:",
-        list(categories.keys()),
+        category_options,
         index=0
     )
     
     # Agent selector within category
-    agents_in_category = categories[selected_category]
+    agents_in_category = categories[selected_category] if categories else bots_in_category(selected_category)
     selected_agent = st.selectbox(
         "Choose Agent:",
         agents_in_category,
@@ -799,97 +1641,148 @@ def display_agent_selector():
     
     # Display agent info
     agent_info = all_bots[selected_agent]
-    card_class = "custom-bot-card" if agent_info.get('is_custom', False) else "agent-card"
-    
-    st.markdown(f"""
-    <div class="{card_class}">
-        <h4>{agent_info.get('emoji', '🤖')} {selected_agent}</h4>
-        <p>{agent_info['description']}</p>
-        <p><strong>Specialties:</strong> {', '.join(agent_info.get('specialties', []))}</p>
-        {f"<p><strong>Custom Bot</strong> ✨</p>" if agent_info.get('is_custom', False) else ""}
-    </div>
-    """, unsafe_allow_html=True)
+    st.markdown(render_agent_card(
+        selected_agent,
+        agent_info.get('emoji', '🤖'),
+        agent_info['description'],
+        tuple(agent_info.get('specialties', [])),
+        agent_info.get('is_custom', False)
+    ), unsafe_allow_html=True)
     
     # Quick actions
     if agent_info.get('quick_actions'):
         st.markdown("**Quick Actions:**")
-        for action in agent_info['quick_actions']:
-            if st.button(action, key=f"action_{action}"):
+        # One two-wide grid instead of a full-width row per button
+        action_cols = st.columns(2)
+        for i, action in enumerate(agent_info['quick_actions']):
+            if action_cols[i % 2].button(action, key=f"action_{action}", use_container_width=True):
                 st.session_state.chat_input = f"Help me with: {action}"
+        
+        if st.button("⚡ Run All Quick Actions", key="action_run_all"):
+            prompts = [f"Help me with: {action}" for action in agent_info['quick_actions']]
+            with st.spinner(f"{selected_agent} is working on {len(prompts)} actions..."):
+                responses = chat_with_agents_batch([(prompt, selected_agent) for prompt in prompts], st.session_state.user_id)
+            for prompt, response in zip(prompts, responses):
+                append_chat_turns(prompt, [selected_agent], [response])
+            flush_pending_saves()
+            st.rerun()
 
 # ======================================================
 # 📄 ENHANCED PAGE FUNCTIONS
 # ======================================================
 
-def display_chat_page():
-    """Display the main chat interface"""
-    # Header with logo
-    col1, col2 = st.columns([1, 4])
-    with col1:
-        display_logo()
-    with col2:
-        st.markdown("""
+def render_chat_turn(msg: Dict, all_bots: Mapping[str, Dict]):
+    """Render one user message and the agent's reply as chat bubbles"""
+    with st.chat_message("user"):
+        st.text(msg['message'])
+        st.caption(f"Agent: {msg['agent']} | {format_message_time(msg)}")
+    
+    # Responses are Markdown from the model, so only they go through the Markdown renderer
+    with st.chat_message("assistant", avatar=all_bots.get(msg['agent'], {}).get('emoji')):
+        st.markdown(msg['response'])
+
+CHAT_HEADER_HTML = """
         <div class="main-header">
-            <h1>AI Agent Toolkit - Chat</h1>
+            <h1>{icon}AI Agent Toolkit - Chat</h1>
             <p>Your comprehensive suite of AI business assistants</p>
         </div>
-        """, unsafe_allow_html=True)
+        """
+
+def display_chat_page():
+    """Display the main chat interface"""
+    # Header with logo; without a logo image the column layout is skipped
+    # and the fallback emoji goes straight into the header block
+    logo = _logo()
+    if logo:
+        col1, col2 = st.columns([1, 4])
+        with col1:
+            st.image(logo, width=150)
+        with col2:
+            st.markdown(CHAT_HEADER_HTML.format(icon=""), unsafe_allow_html=True)
+    else:
+        st.markdown(CHAT_HEADER_HTML.format(icon="🤖 "), unsafe_allow_html=True)
+    
+    all_bots = get_all_bots(st.session_state.user_id)
+    
+    # New turns are written into this container later in the same run, so sending
+    # a message doesn't need a full rerun to show it
+    history_box = st.container()
     
     # Chat history
-    if st.session_state.chat_history:
-        st.markdown("### 💬 Conversation History")
-        
-        # Show recent messages with pagination
-        user_prefs = load_user_preferences(st.session_state.user_id)
-        history_limit = user_prefs.get('chat_history_limit', 10)
-        
-        for msg in st.session_state.chat_history[-history_limit:]:
-            st.markdown(f"""
-            <div class="user-message">
-                <strong>You:</strong> {msg['message']}
-                <div style="font-size: 0.8em; opacity: 0.7; margin-top: 5px;">
-                    Agent: {msg['agent']} | {msg['timestamp']}
-                </div>
-            </div>
-            """, unsafe_allow_html=True)
+    with history_box:
+        if st.session_state.chat_history:
+            st.markdown("### 💬 Conversation History")
             
-            st.markdown(f"""
-            <div class="assistant-message">
-                <strong>{msg['agent']}:</strong> {msg['response']}
-            </div>
-            """, unsafe_allow_html=True)
+            # Show recent messages with pagination
+            user_prefs = load_user_preferences(st.session_state.user_id)
+            history_limit = user_prefs.get('chat_history_limit', 10)
+            
+            history_summary = current_history_summary()
+            if history_summary:
+                with st.expander("📝 Summary of earlier conversation"):
+                    st.markdown(history_summary)
+            
+            if st.button("🧹 Clear history", key="clear_chat_history"):
+                clear_chat_history()
+                st.rerun()
+            
+            recent_history = get_recent_history(history_limit)
+            earlier, latest = recent_history[:-LIVE_HISTORY_TURNS], recent_history[-LIVE_HISTORY_TURNS:]
+            
+            # Older turns are only rendered when asked for, so typing doesn't redraw them
+            if earlier and st.toggle(f"Show {len(earlier)} earlier messages", key="show_earlier_history"):
+                for msg in earlier:
+                    render_chat_turn(msg, all_bots)
+            
+            for msg in latest:
+                render_chat_turn(msg, all_bots)
     
     # Chat input
     st.markdown("### 💭 Ask Your AI Assistant")
     
-    # Use session state for input if set by quick actions
-    default_input = st.session_state.get('chat_input', '')
-    if default_input:
-        st.session_state.chat_input = ''  # Clear after use
-    
-    user_input = st.text_area(
-        f"Message {st.session_state.selected_agent}:",
-        value=default_input,
-        height=100,
-        placeholder=f"Ask {st.session_state.selected_agent} for business advice..."
+    # Optionally send the same message to other agents in parallel
+    compare_agents = st.multiselect(
+        "Compare with other agents:",
+        [name for name in all_bots if name != st.session_state.selected_agent],
+        key="compare_agents"
     )
     
-    if st.button("Send Message", type="primary"):
-        if user_input.strip():
-            with st.spinner(f"{st.session_state.selected_agent} is thinking..."):
-                response = chat_with_agent(user_input, st.session_state.selected_agent, st.session_state.user_id)
-                
-                # Add to chat history
-                st.session_state.chat_history.append({
-                    'message': user_input,
-                    'response': response,
-                    'agent': st.session_state.selected_agent,
-                    'timestamp': datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                })
-                
-                st.rerun()
-        else:
-            st.warning("Please enter a message")
+    # st.chat_input only reruns on submit, unlike a text area that reruns per edit.
+    # Quick actions can't prefill it, so a pending quick action is sent directly.
+    user_input = st.chat_input(f"Ask {st.session_state.selected_agent} for business advice...")
+    if not user_input:
+        user_input = st.session_state.get('chat_input', '')
+    st.session_state.chat_input = ''  # Clear after use
+    
+    if user_input and user_input.strip():
+        agent_names = [st.session_state.selected_agent] + compare_agents
+        if not compare_agents:
+            # Render tokens as they arrive instead of waiting for the full completion
+            with history_box:
+                with st.chat_message("user"):
+                    st.text(user_input)
+                    st.caption(f"Agent: {st.session_state.selected_agent}")
+                with st.chat_message("assistant", avatar=all_bots.get(st.session_state.selected_agent, {}).get('emoji')):
+                    response = st.write_stream(
+                        chat_with_agent_stream(user_input, st.session_state.selected_agent, st.session_state.user_id)
+                    )
+            append_chat_turns(user_input, agent_names, [response])
+            # The reply is already on screen, so saving it now doesn't delay it
+            flush_pending_saves()
+            return
+        
+        with st.spinner(f"{len(agent_names)} agents are thinking..."):
+            responses = chat_with_agents_batch(
+                [(user_input, agent_name) for agent_name in agent_names],
+                st.session_state.user_id
+            )
+        
+        # Add to chat history and show only the new turns
+        append_chat_turns(user_input, agent_names, responses)
+        with history_box:
+            for msg in get_recent_history(len(agent_names)):
+                render_chat_turn(msg, all_bots)
+        flush_pending_saves()
 
 def display_custom_bots_page():
     """Display the custom bots management page"""
@@ -935,8 +1828,8 @@ def display_custom_bots_page():
             if create_submitted:
                 if bot_name and bot_description and system_prompt:
                     # Process specialties and quick actions
-                    specialties = [s.strip() for s in specialties_input.split(',') if s.strip()]
-                    quick_actions = [a.strip() for a in quick_actions_input.split(',') if a.strip()]
+                    specialties = [s for s in (part.strip() for part in specialties_input.split(',')) if s]
+                    quick_actions = [a for a in (part.strip() for part in quick_actions_input.split(',')) if a]
                     
                     bot_data = {
                         'description': bot_description,
@@ -966,23 +1859,22 @@ def display_custom_bots_page():
         else:
             for bot_name, bot_data in custom_bots.items():
                 with st.expander(f"{bot_data.get('emoji', '🤖')} {bot_name}"):
-                    col1, col2 = st.columns([3, 1])
+                    # One markdown element per bot; trailing double spaces are Markdown line breaks
+                    st.markdown(
+                        f"**Description:** {bot_data['description']}  \n"
+                        f"**Category:** {bot_data.get('category', 'My Custom Bots')}  \n"
+                        f"**Specialties:** {', '.join(bot_data.get('specialties', []))}  \n"
+                        f"**Quick Actions:** {', '.join(bot_data.get('quick_actions', []))}  \n"
+                        f"**Temperature:** {bot_data.get('temperature', 0.7)}  \n"
+                        f"**Created:** {bot_data.get('created_at', 'Unknown')}"
+                    )
                     
-                    with col1:
-                        st.write(f"**Description:** {bot_data['description']}")
-                        st.write(f"**Category:** {bot_data.get('category', 'My Custom Bots')}")
-                        st.write(f"**Specialties:** {', '.join(bot_data.get('specialties', []))}")
-                        st.write(f"**Quick Actions:** {', '.join(bot_data.get('quick_actions', []))}")
-                        st.write(f"**Temperature:** {bot_data.get('temperature', 0.7)}")
-                        st.write(f"**Created:** {bot_data.get('created_at', 'Unknown')}")
-                    
-                    with col2:
-                        if st.button(f"Delete", key=f"delete_{bot_name}", type="secondary"):
-                            if delete_custom_bot(st.session_state.user_id, bot_name):
-                                st.success(f"Deleted '{bot_name}'")
-                                st.rerun()
-                            else:
-                                st.error("Failed to delete bot")
+                    if st.button(f"Delete", key=f"delete_{bot_name}", type="secondary"):
+                        if delete_custom_bot(st.session_state.user_id, bot_name):
+                            st.success(f"Deleted '{bot_name}'")
+                            st.rerun()
+                        else:
+                            st.error("Failed to delete bot")
     
     with tab3:
         st.subheader("📋 Bot Templates")
@@ -1054,10 +1946,12 @@ def display_user_profile_page():
             col1, col2 = st.columns(2)
             
             with col1:
+                current_model = user_prefs.get('default_model') or "Agent default"
                 default_model = st.selectbox(
-                    "Default AI Model",
-                    ["gpt-4", "gpt-3.5-turbo"],
-                    index=0 if user_prefs.get('default_model', 'gpt-4') == 'gpt-4' else 1
+                    "AI Model",
+                    MODEL_OPTIONS,
+                    index=MODEL_OPTIONS.index(current_model) if current_model in MODEL_OPTIONS else 0,
+                    help="Agent default uses each agent's own model; pick a model to use it for every agent"
                 )
                 
                 default_temperature = st.slider(
@@ -1082,7 +1976,7 @@ def display_user_profile_page():
             
             if st.form_submit_button("Save Preferences", type="primary"):
                 new_prefs = {
-                    'default_model': default_model,
+                    'default_model': None if default_model == "Agent default" else default_model,
                     'default_temperature': default_temperature,
                     'chat_history_limit': chat_history_limit,
                     'auto_save_chats': auto_save_chats,
@@ -1098,24 +1992,36 @@ def display_user_profile_page():
     with tab3:
         st.subheader("🗄️ Data Management")
         
+        # Pick up a rotated OpenAI key without restarting the server
+        if st.button("🔑 Reload API Key", type="secondary"):
+            get_openai_client.clear()
+            st.success("API key reloaded!")
+        
+        # Cached replies are shared across sessions; clearing forces fresh answers
+        if st.button("♻️ Clear Response Cache", type="secondary"):
+            get_response_cache().clear()
+            st.success("Response cache cleared!")
+        
         # Clear data options
         col1, col2 = st.columns(2)
         
         with col1:
             if st.button("🗑️ Clear Chat History", type="secondary"):
-                st.session_state.chat_history = []
+                clear_chat_history()
+                # Unsaved messages would be written after the clear, so drop them too
+                st.session_state.get('pending_saves', []).clear()
                 # Also clear from persistent storage if available
-                try:
+                if 'clear_chat_history' in _AUTH_METHODS:
                     enhanced_auth.clear_chat_history(st.session_state.user_id)
-                except AttributeError:
-                    pass
                 st.success("Chat history cleared!")
                 st.rerun()
         
         with col2:
             if st.button("⚠️ Delete All Custom Bots", type="secondary"):
-                if st.session_state.user_id in st.session_state.get('custom_bots', {}):
-                    st.session_state.custom_bots[st.session_state.user_id] = {}
+                custom_bots = load_custom_bots(st.session_state.user_id)
+                if custom_bots:
+                    for bot_name in list(custom_bots):
+                        delete_custom_bot(st.session_state.user_id, bot_name)
                     st.success("All custom bots deleted!")
                     st.rerun()
         
@@ -1125,7 +2031,7 @@ def display_user_profile_page():
             export_data = {
                 'user_id': st.session_state.user_id,
                 'custom_bots': load_custom_bots(st.session_state.user_id),
-                'chat_history': st.session_state.chat_history,
+                'chat_history': list(st.session_state.chat_history),
                 'preferences': load_user_preferences(st.session_state.user_id),
                 'export_date': datetime.now().isoformat()
             }
@@ -1170,6 +2076,9 @@ def display_analytics_page():
             avg_msg_length = sum(len(msg['message']) for msg in st.session_state.chat_history) / len(st.session_state.chat_history)
             st.metric("Avg Message Length", f"{avg_msg_length:.0f} chars")
     
+    # Plotly is only needed on this page, so keep it off the startup path
+    import plotly.express as px
+    
     # Agent usage chart
     st.subheader("🤖 Agent Usage Distribution")
     agent_usage = {}
@@ -1191,12 +2100,11 @@ def display_analytics_page():
         # Group messages by date
         daily_activity = {}
         for msg in st.session_state.chat_history:
-            try:
-                date = datetime.fromisoformat(msg['timestamp']).date()
-                daily_activity[date] = daily_activity.get(date, 0) + 1
-            except:
-                # Handle different timestamp formats
+            moment = message_datetime(msg)
+            if moment is None:
+                # Skip entries without a readable time
                 continue
+            daily_activity[moment.date()] = daily_activity.get(moment.date(), 0) + 1
         
         if daily_activity:
             dates = list(daily_activity.keys())
@@ -1228,30 +2136,27 @@ def display_sidebar():
         if st.session_state.current_page == "Chat":
             display_agent_selector()
         
-        # Quick stats
-        st.markdown("""
+        # Quick stats, drawn as one element instead of a heading plus three metric widgets
+        total_custom_bots = len(load_custom_bots(st.session_state.user_id))
+        st.markdown(f"""
         <div class="sidebar-section">
             <h3>📊 Quick Stats</h3>
+            <div class="sidebar-stats">
+                <div class="stat"><span class="stat-value">{st.session_state.total_messages}</span><span class="stat-label">Messages</span></div>
+                <div class="stat"><span class="stat-value">{total_custom_bots}</span><span class="stat-label">Custom Bots</span></div>
+                <div class="stat"><span class="stat-value">{len(st.session_state.agents_used)}</span><span class="stat-label">Agents Consulted</span></div>
+            </div>
         </div>
         """, unsafe_allow_html=True)
         
-        total_messages = len(st.session_state.chat_history)
-        st.metric("Total Messages", total_messages)
-        
-        total_custom_bots = len(load_custom_bots(st.session_state.user_id))
-        st.metric("Custom Bots", total_custom_bots)
-        
-        if st.session_state.chat_history:
-            agents_used = len(set(msg['agent'] for msg in st.session_state.chat_history))
-            st.metric("Agents Consulted", agents_used)
-        
         # Logout button
         if st.button("🚪 Logout"):
+            flush_pending_saves(force=True)
             result = enhanced_auth.sign_out()
             st.session_state.authenticated = False
             st.session_state.user_email = None
             st.session_state.user_id = None
-            st.session_state.chat_history = []
+            clear_chat_history()
             st.session_state.current_page = "Chat"
             if result['success']:
                 st.success(result['message'])
@@ -1281,6 +2186,9 @@ def main():
             display_analytics_page()
         else:
             display_chat_page()  # Default fallback
+        
+        # Anything still buffered (e.g. quick action replies) is saved within a few seconds
+        flush_stale_saves()
 
 if __name__ == "__main__":
     main()
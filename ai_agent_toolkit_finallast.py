@@ -15,14 +15,7 @@ from typing import Dict, List, Tuple, Optional
 import logging
 import hashlib
 import os
-import pandas as pd
-import io
-import base64
-import requests
-from PIL import Image
-import plotly.express as px
-import plotly.graph_objects as go
-from plotly.subplots import make_subplots
+import functools
 import uuid
 
 from enhanced_supabase_client import EnhancedSupabaseClient
@@ -1331,6 +1324,13 @@ def display_existing_custom_bots():
                 with st.expander("🧠 View System Prompt"):
                     st.code(bot_data.get('system_prompt', 'No system prompt defined'), language='text')
 
+@functools.cache
+def _lazy_viz():
+    """Import pandas and plotly on first use; only the profile page needs them"""
+    import pandas as pd
+    import plotly.express as px
+    return pd, px
+
 def display_user_profile_page():
     """Display user profile and settings page"""
     st.markdown("""
@@ -1413,6 +1413,7 @@ def display_user_profile_page():
         if st.button("💾 Export Chat History", type="secondary", use_container_width=True):
             if st.session_state.chat_history:
                 # Convert chat history to DataFrame
+                pd, _ = _lazy_viz()
                 df = pd.DataFrame(st.session_state.chat_history)
                 csv = df.to_csv(index=False)
                 
@@ -1437,6 +1438,7 @@ def display_user_profile_page():
             agent_counts[agent] = agent_counts.get(agent, 0) + 1
         
         if agent_counts:
+            pd, px = _lazy_viz()
             col1, col2 = st.columns(2)
             
             with col1:
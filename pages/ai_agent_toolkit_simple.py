@@ -470,8 +470,8 @@ def display_custom_bots_page():
             
             if create_submitted:
                 if bot_name and bot_description and system_prompt:
-                    specialties = [s.strip() for s in specialties_input.split(',') if s.strip()]
-                    quick_actions = [a.strip() for a in quick_actions_input.split(',') if a.strip()]
+                    specialties = [s for s in (part.strip() for part in specialties_input.split(',')) if s]
+                    quick_actions = [a for a in (part.strip() for part in quick_actions_input.split(',')) if a]
                     
                     bot_data = {
                         'description': bot_description,
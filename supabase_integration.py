@@ -13,6 +13,38 @@ from datetime import datetime
 
 logger = logging.getLogger(__name__)
 
+# Remote custom bot reads are cached per user; saving or deleting bumps only that
+# user's version, so their next read misses without evicting anyone else's entry
+CUSTOM_BOTS_CACHE_TTL = 60
+_custom_bots_versions: Dict[str, int] = {}
+
+@st.cache_data(ttl=CUSTOM_BOTS_CACHE_TTL, show_spinner=False)
+def _fetch_custom_bots(_client: Client, user_id: str, version: int) -> Dict[str, Dict[str, Any]]:
+    """Fetch a user's custom bots from Supabase; failures raise, so they are never cached"""
+    result = _client.table('custom_bots').select('*').eq('user_id', user_id).execute()
+    
+    custom_bots = {}
+    for bot_data in result.data:
+        bot_name = bot_data['name']
+        custom_bots[bot_name] = {
+            'description': bot_data['description'],
+            'emoji': bot_data['emoji'],
+            'category': bot_data['category'],
+            'temperature': bot_data['temperature'],
+            'system_prompt': bot_data['system_prompt'],
+            'specialties': bot_data['specialties'],
+            'quick_actions': bot_data['quick_actions'],
+            'is_custom': True,
+            'created_at': bot_data['created_at'],
+            'updated_at': bot_data['updated_at']
+        }
+    
+    return custom_bots
+
+def _invalidate_custom_bots(user_id: str):
+    """Make the next custom bot read for this user go to Supabase"""
+    _custom_bots_versions[user_id] = _custom_bots_versions.get(user_id, 0) + 1
+
 class EnhancedSupabaseAuth:
     """Enhanced Supabase authentication and data handler"""
     
@@ -224,6 +256,7 @@ class EnhancedSupabaseAuth:
             result = self.supabase.table('custom_bots').upsert(supabase_data).execute()
             
             if result.data:
+                _invalidate_custom_bots(user_id)
                 logger.info(f"Custom bot '{bot_name}' saved successfully for user {user_id}")
                 return True
             else:
@@ -242,25 +275,7 @@ class EnhancedSupabaseAuth:
             return self._load_custom_bots_local(user_id)
         
         try:
-            result = self.supabase.table('custom_bots').select('*').eq('user_id', user_id).execute()
-            
-            custom_bots = {}
-            for bot_data in result.data:
-                bot_name = bot_data['name']
-                custom_bots[bot_name] = {
-                    'description': bot_data['description'],
-                    'emoji': bot_data['emoji'],
-                    'category': bot_data['category'],
-                    'temperature': bot_data['temperature'],
-                    'system_prompt': bot_data['system_prompt'],
-                    'specialties': bot_data['specialties'],
-                    'quick_actions': bot_data['quick_actions'],
-                    'is_custom': True,
-                    'created_at': bot_data['created_at'],
-                    'updated_at': bot_data['updated_at']
-                }
-            
-            return custom_bots
+            return _fetch_custom_bots(self.supabase, user_id, _custom_bots_versions.get(user_id, 0))
             
         except Exception as e:
             logger.error(f"Error loading custom bots: {str(e)}")
@@ -277,6 +292,7 @@ class EnhancedSupabaseAuth:
             result = self.supabase.table('custom_bots').delete().eq('user_id', user_id).eq('name', bot_name).execute()
             
             if result.data:
+                _invalidate_custom_bots(user_id)
                 logger.info(f"Custom bot '{bot_name}' deleted successfully for user {user_id}")
                 return True
             else:
@@ -318,6 +334,24 @@ class EnhancedSupabaseAuth:
             logger.error(f"Error saving chat message: {str(e)}")
             return False
     
+    def save_chat_messages(self, messages: List[Dict[str, Any]]) -> bool:
+        """Save several chat messages to Supabase in a single insert"""
+        if not self.is_configured() or not messages:
+            # In demo mode, chat history is already managed in session state
+            return True
+        
+        try:
+            result = self.supabase.table('chat_histories').insert(messages).execute()
+            
+            if result.data:
+                return True
+            else:
+                return False
+                
+        except Exception as e:
+            logger.error(f"Error saving chat messages: {str(e)}")
+            return False
+    
     def load_chat_history(self, user_id: str, limit: int = 50) -> List[Dict[str, Any]]:
         """Load chat history for a user from Supabase"""
         if not self.is_configured():